@@ -1,8 +1,12 @@
 import numpy as np
 import matplotlib as plt
-import pandas as pd
 import csv
 import os
+import sys
+
+# Output files of the model (csv or npz trace files) are read with the reader of the model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+from trace_file import read_results
 
 def get_pos_neg_lines(data):
     """
@@ -76,7 +80,7 @@ if __name__ == "__main__":
     """
 
     filename = "result_msr_MSR_fit0_its100000_addprob1_time26_20_13_22.csv"
-    data = pd.read_csv(filename)
+    data = read_results(filename)
     data = data[data['sim']<60]
 
     f0=.5
@@ -86,7 +90,7 @@ if __name__ == "__main__":
     # Create folder
     os.makedirs('commit_sizes', exist_ok=True)
     # Create file
-    filename = "commit_sizes/commits_" + filename
+    filename = "commit_sizes/commits_" + os.path.splitext(filename)[0] + ".csv"
     with open(filename, mode='w', newline='') as csv_file:
         writer = csv.writer(csv_file, delimiter=',')
         # Header
@@ -1,7 +1,11 @@
-import pandas as pd
 import numpy as np
 import pickle
 import os
+import sys
+
+# Output files of the model (csv or npz trace files) are read with the reader of the model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+from trace_file import read_results
 
 def get_statistics(data, f0):
     """
@@ -171,13 +175,13 @@ if __name__ == "__main__":
 
     os.makedirs('commit_sizes', exist_ok=True)
 
-    data = pd.read_csv(filename)
+    data = read_results(filename)
     data = data[data['sim']<60]
     data['action'][data['action']=='delete_method'] = 'remove_method'
     dictionary = get_statistics(data, f0)
 
     # Pickle dict
-    pickle.dump(dictionary, open('pickles/' +filename[:-4] + ".p", "wb" ))
+    pickle.dump(dictionary, open('pickles/' + os.path.splitext(filename)[0] + ".p", "wb" ))
 
 
 
@@ -111,13 +111,20 @@ class Evolver:
         return method_fitness[1]
 
 
-    def run_model(self):
+    def run_model(self, profiler=None):
         """
         Run function that completely runs the model
+
+        Args:
+            profiler (StepProfiler): Profiles the steps in its window, None to not profile
         """
         for _ in range(self.iterations):
+            if profiler is not None:
+                profiler.step(self.step_n)
             self.changes.append(self.step())
             self.step_n += 1
+        if profiler is not None:
+            profiler.disable()
 
     def step(self):
         p_create_method = 0.2
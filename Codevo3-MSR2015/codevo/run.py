@@ -6,6 +6,9 @@ import pandas as pd
 import time
 import sys
 import os
+import random
+from multiprocessing import Pool
+import numpy as np
 
 # Custom imports
 # from model import Evolver
@@ -14,14 +17,22 @@ import csv
 import datetime
 from evolver import Evolver
 
+# The profiler of the simulation model is shared with this model
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'model'))
+from profiling import StepProfiler
+
 # from visualize_graph import visualize_graph
 
 DEFAULT_SIMULATIONS = 100
 DEFAULT_ITERATIONS = 100000 # 100,000 steps is around 15 mins
+DEFAULT_WORKERS = 1 # Number of worker processes, more than 1 runs the simulations in parallel
+DEFAULT_SEED = None # Root seed of the simulations, None for fresh entropy (the seed used is printed)
 # fitness method = 0 -> uniform distribution
 FITNESS_METHOD = 0
 LOGGING = False # Creates a fake log for gource
 EXP_CONDITION = 'MSR' # reproduce (recursion/multiple calls possible), 'no_rec', 'delete_state' ...
+PROFILE_STEPS = None # (start, stop) window of steps to profile with cProfile, e.g. (1000, 2000) to skip 1000 warm-up steps,
+                     # the .pstats and speedscope .json files are written next to the output file. None to not profile
 PROBABILITIES = {
     'create_method': 0.1,
     'call_method': 0.4,
@@ -38,6 +49,9 @@ def run_repo_model():
     Argument 1 (int): Amount of iterations to run model
     Argument 2 (bool): Whether to generate the java files created during the simulation
     Argument 3 (int): Amount of simulations of the model to run
+    Argument 4-8 (float): Probabilities of create_class, create_method, call_method, update_method and delete_method
+    Argument 9 (int): Number of worker processes to run the simulations in parallel
+    Argument 10 (int): Root seed, every simulation gets its own seed spawned from it
     """
 
     iterations = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS
@@ -48,6 +62,8 @@ def run_repo_model():
     PROBABILITIES['call_method'] = float(sys.argv[6]) if len(sys.argv) > 6 else PROBABILITIES['call_method']
     PROBABILITIES['update_method'] = float(sys.argv[7]) if len(sys.argv) > 7 else PROBABILITIES['update_method']
     PROBABILITIES['delete_method'] = float(sys.argv[8]) if len(sys.argv) > 8 else PROBABILITIES['delete_method']
+    workers = int(sys.argv[9]) if len(sys.argv) > 9 else DEFAULT_WORKERS
+    seed = int(sys.argv[10]) if len(sys.argv) > 10 else DEFAULT_SEED
     print(sys.argv)
     print(PROBABILITIES)
     assert (EXP_CONDITION in ['reproduce', 'no_rec', 'delete_state', 'MSR'])
@@ -69,9 +85,28 @@ def run_repo_model():
     if LOGGING:
         os.makedirs('./vid', exist_ok=True)
 
+    # Independent seeds for the simulations, spawned from the root seed
+    seed_sequence = np.random.SeedSequence(seed)
+    print('Random seed: {}'.format(seed_sequence.entropy))
+    seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(simulations)]
+
+    gen = True if len(sys.argv) > 2 and sys.argv[2] == 'True' else False
+
+    if workers > 1:
+        # Fan the simulations out over a process pool, the results are written in sim order
+        jobs = [{'sim': sim, 'iterations': iterations, 'probabilities': dict(PROBABILITIES), 'add_prob': add_prob,
+                 'seed': seeds[sim], 'profile': profile_basename(filename, sim),
+                 'generate_files': gen and sim == simulations - 1} for sim in range(simulations)]
+        with Pool(workers) as pool:
+            for sim, rows, run_time in pool.imap(run_simulation, jobs):
+                print('Simulation {} of {} completed, took {} seconds.'.format(sim+1, simulations, run_time))
+                append_rows(rows, filename)
+        return
+
     for sim in range(simulations):
         print('Simulation {} of {}'.format(sim+1, simulations))
 
+        random.seed(seeds[sim])
         model = Evolver(iterations, FITNESS_METHOD, PROBABILITIES, EXP_CONDITION, add_prob, LOGGING)
         # model = Evolver()
         print('Model instantiated...\n')
@@ -79,22 +114,44 @@ def run_repo_model():
         print('Running model...')
 
         start_time = time.time()
-        model.run_model()
+        profiler = create_profiler()
+        model.run_model(profiler)
 
         print('Model run completed..!\nTook {} seconds.\n'.format(time.time() - start_time))
+        write_profile(profiler, profile_basename(filename, sim))
 
-        gen = True if len(sys.argv) > 2 and sys.argv[2] == 'True' else False
         gather_results(model, gen)
         filename = append_outputfile_try(model, sim, filename, iterations, add_prob)
 
         # visualize_graph(model.reference_graph)
 
+def run_simulation(job):
+    """
+    Runs one simulation in a worker process of the pool
+
+    Args:
+        job (dict): sim, iterations, probabilities, add_prob, seed, the filename without extension of the profile
+            of the simulation and generate_files, whether to generate the java files of the simulation
+
+    Returns:
+        (sim, list of output rows, run time in seconds)
+    """
+    random.seed(job['seed'])
+    model = Evolver(job['iterations'], FITNESS_METHOD, job['probabilities'], EXP_CONDITION, job['add_prob'], LOGGING)
+    start_time = time.time()
+    profiler = create_profiler()
+    model.run_model(profiler)
+    run_time = time.time() - start_time
+    write_profile(profiler, job['profile'])
+    gather_results(model, job['generate_files'])
+    return job['sim'], list(output_rows(model, job['sim'])), run_time
+
 def gather_results(model, generate_files):
     """
     Gathers and analyses model results
 
     Args:
-        - model (Code_dev_simulation): Model to analyse the results of
+        - model (Evolver): Model to analyse the results of
         - generate_files (bool): Indicates whether to generate the created java files
 
     """
@@ -104,7 +161,8 @@ def gather_results(model, generate_files):
                 for name in files:
                     os.remove(os.path.join(root, name))
         os.makedirs('output/src', exist_ok=True)
-        for class_info in model.classes:
+        for _, data in model.inheritance_graph.nodes_iter(data=True):
+            class_info = data['class']
             java_printer = JavaPrinter()
             class_info.accept(java_printer)
             with open(os.path.join('output/src', class_info.name + '.java'), 'w') as java_file:
@@ -153,13 +211,45 @@ def append_outputfile(model, sim, filename):
     Columns are 'sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'
 
     """
-    # Open file
+    append_rows(output_rows(model, sim), filename)
+
+def output_rows(model, sim):
+    """
+    Generates the output rows of a simulation, one row per simulation step
+    """
+    for row in range(len(model.list_fmin)):
+        yield [sim, row, model.list_fmin[row], model.list_action[row]] + model.list_fit_stats[row] + [
+            model.total_code_size[row]] + [model.changes[row]]
+
+def create_profiler():
+    """
+    Creates the profiler of the PROFILE_STEPS window of a simulation, None when not profiling
+    """
+    if PROFILE_STEPS is None:
+        return None
+    return StepProfiler(PROFILE_STEPS[0], PROFILE_STEPS[1])
+
+def write_profile(profiler, basename):
+    """
+    Writes the .pstats and speedscope .json files of a profiled simulation and prints its hottest Evolver functions
+    """
+    if profiler is not None and profiler.write(basename):
+        profiler.print_hot_functions(Evolver)
+        print('Profile written to {}.pstats and {}.speedscope.json'.format(basename, basename))
+
+def profile_basename(filename, sim):
+    """
+    Returns the filename without extension of the profile of a simulation, next to the output file
+    """
+    return '{}.sim{}'.format(os.path.splitext(filename)[0], sim)
+
+def append_rows(rows, filename):
+    """
+    Appends output rows to the output file
+    """
     with open(filename, mode='a', newline='') as csv_file:
         writer = csv.writer(csv_file, delimiter=',')
-        # Write rows
-        for row in range(len(model.list_fmin)):
-            writer.writerow([sim, row, model.list_fmin[row], model.list_action[row]] + model.list_fit_stats[row] + [
-                model.total_code_size[row]] + [model.changes[row]])
+        writer.writerows(rows)
 
 if __name__ == "__main__":
     run_repo_model()
@@ -0,0 +1,217 @@
+"""
+Benchmarks of the simulation engines, code_dev_simulation (model/) and the Evolver of Codevo3-MSR2015
+
+Every case runs in a fresh Python process with a fixed seed, which reports the steps per second and its
+peak resident memory (RSS). The results are written to a JSON file in benchmarks/results, named after the
+date and the git commit, so the results of two commits can be compared.
+
+Usage:
+    python benchmark.py                     Run all cases
+    python benchmark.py 1000 10000          Run all cases with these numbers of steps
+    python benchmark.py compare old new     Compare two result files
+"""
+
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BENCHMARK_DIR, '..', 'model')
+CODEVO_DIR = os.path.join(BENCHMARK_DIR, '..', 'Codevo3-MSR2015', 'codevo')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+SEED = 1
+STEPS = [1000, 10000, 100000]
+EVOLVER_STEPS = [1000, 10000] # The Evolver keeps the reference graph in networkx and is much slower
+EXP_CONDITIONS = ['reproduce', 'no_rec', 'delete_state']
+PREF_ATTACH_CONDITIONS = [0, 1, 2, 3]
+LAZY_AST = False # Benchmark the counts-only mode of the model
+
+PROBABILITIES = {
+    'create_method': 0.1,
+    'call_method': 0.4,
+    'update_method': 0.45,
+    'delete_method': 0.05,
+    'create_class': 0.1
+}
+ADD_STATE = .8 # Prob of adding statement vs deleting, in the delete_state condition
+
+def benchmark_cases(steps=None):
+    """
+    Returns the list of cases to benchmark, every case is a dict with the model, exp_condition,
+    pref_attach_condition, steps and seed
+    """
+    cases = []
+    for n_steps in steps or STEPS:
+        for exp_condition in EXP_CONDITIONS:
+            for pref_attach_condition in PREF_ATTACH_CONDITIONS:
+                cases.append({'model': 'code_dev_simulation', 'exp_condition': exp_condition,
+                              'pref_attach_condition': pref_attach_condition, 'steps': n_steps, 'seed': SEED})
+    for n_steps in steps or EVOLVER_STEPS:
+        cases.append({'model': 'Evolver', 'exp_condition': 'MSR', 'pref_attach_condition': None,
+                      'steps': n_steps, 'seed': SEED})
+    return cases
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of this process in MB
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_case(case):
+    """
+    Runs one benchmark case in this process
+
+    Returns:
+        Dict with the seconds to set up and to run the model, the steps per second, the number of
+        methods at the end of the run (the same seed should give the same number) and the peak RSS
+    """
+    add_state = ADD_STATE if case['exp_condition'] == 'delete_state' else 1
+    if case['model'] == 'code_dev_simulation':
+        sys.path.insert(0, MODEL_DIR)
+        from model import code_dev_simulation
+        import_rss = peak_rss_mb()
+
+        start = time.perf_counter()
+        model = code_dev_simulation(case['steps'], 0, dict(PROBABILITIES), case['exp_condition'], add_state, False,
+                                    case['pref_attach_condition'], lazy_ast=LAZY_AST, seed=case['seed'], keep_lists=False)
+        setup_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model.run_model()
+        run_seconds = time.perf_counter() - start
+        methods = len(model.store)
+    else:
+        sys.path.insert(0, CODEVO_DIR)
+        from evolver import Evolver
+        import_rss = peak_rss_mb()
+
+        # The Evolver prints every step and draws from the random module
+        random.seed(case['seed'])
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            start = time.perf_counter()
+            model = Evolver(case['steps'], 0, dict(PROBABILITIES), case['exp_condition'], add_state, False)
+            setup_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model.run_model()
+            run_seconds = time.perf_counter() - start
+        methods = model.reference_graph.number_of_nodes()
+
+    return {
+        'setup_seconds': setup_seconds,
+        'run_seconds': run_seconds,
+        'steps_per_second': case['steps'] / run_seconds,
+        'methods': methods,
+        'import_rss_mb': import_rss,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def run_case_process(case):
+    """
+    Runs one benchmark case in a fresh Python process, so the peak RSS is of that case only
+
+    Returns:
+        The result of run_case(), or a dict with the error if the case failed
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'result.json')
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), 'case', json.dumps(case), filename],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        if process.returncode != 0:
+            lines = process.stderr.strip().splitlines()
+            return {'error': lines[-1] if lines else 'exit code {}'.format(process.returncode)}
+        with open(filename) as result_file:
+            return json.load(result_file)
+
+def git_commit():
+    """
+    Returns the hash of the checked out git commit, or None if it is not known
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCHMARK_DIR,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(steps=None):
+    """
+    Runs all benchmark cases and writes the results to a JSON file in RESULTS_DIR
+
+    Returns:
+        Filename of the results
+    """
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'date': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'lazy_ast': LAZY_AST,
+        'cases': []
+    }
+    for case in benchmark_cases(steps):
+        result = run_case_process(case)
+        results['cases'].append(dict(case, **result))
+        print('{} {} pref {} {} steps: {}'.format(case['model'], case['exp_condition'], case['pref_attach_condition'],
+                                                 case['steps'], format_result(result)))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    filename = os.path.join(RESULTS_DIR, '{}_{}.json'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'),
+                                                             (commit or 'unknown')[:8]))
+    with open(filename, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    print('Results written to {}'.format(filename))
+    return filename
+
+def format_result(result):
+    """
+    Returns a line with the steps per second and peak RSS of a result
+    """
+    if 'error' in result:
+        return 'failed: ' + result['error']
+    return '{:.0f} steps/s, {:.1f} MB peak RSS'.format(result['steps_per_second'], result['peak_rss_mb'])
+
+def compare(old_filename, new_filename):
+    """
+    Prints the steps per second and peak RSS of the cases in two result files side by side
+    """
+    results = []
+    for filename in [old_filename, new_filename]:
+        with open(filename) as results_file:
+            data = json.load(results_file)
+        results.append({(case['model'], case['exp_condition'], case['pref_attach_condition'], case['steps']): case
+                        for case in data['cases']})
+        print('{}: commit {}, {}'.format(filename, data['commit'], data['date']))
+
+    print('{:<40} {:>12} {:>12} {:>7} {:>10} {:>10}'.format('case', 'old steps/s', 'new steps/s', 'ratio', 'old MB', 'new MB'))
+    for key, old in results[0].items():
+        new = results[1].get(key)
+        if new is None or 'error' in old or 'error' in new:
+            continue
+        name = '{} {} pref {} {}'.format(*key)
+        print('{:<40} {:>12.0f} {:>12.0f} {:>7.2f} {:>10.1f} {:>10.1f}'.format(
+            name, old['steps_per_second'], new['steps_per_second'], new['steps_per_second'] / old['steps_per_second'],
+            old['peak_rss_mb'], new['peak_rss_mb']))
+        if old['methods'] != new['methods']:
+            print('    the runs differ: {} methods before and {} after'.format(old['methods'], new['methods']))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'case':
+        # Run a single case in this process, used by run_case_process()
+        with open(sys.argv[3], 'w') as result_file:
+            json.dump(run_case(json.loads(sys.argv[2])), result_file)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        run_benchmarks([int(steps) for steps in sys.argv[1:]] or None)
@@ -0,0 +1,195 @@
+"""
+Scaling benchmark of code_dev_simulation: the cost of a step and of every action versus the size of the code base
+
+One long run is made with a fixed seed. Every call of an action is timed together with the number of methods
+and the number of calls between methods (edges) at that moment. The times are bucketed on a log scale of the
+number of methods and of edges, and per action a power law is fitted to the median time of the buckets.
+An exponent around 0 means the cost of the action does not grow with the code base, 1 means it grows linearly.
+The buckets and exponents are written to a JSON file and plotted, both in benchmarks/results.
+
+Usage:
+    python scaling.py                 Run STEPS steps
+    python scaling.py 500000          Run 500000 steps
+"""
+
+import datetime
+import functools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from benchmark import MODEL_DIR, RESULTS_DIR, PROBABILITIES, ADD_STATE, SEED, git_commit
+
+sys.path.insert(0, MODEL_DIR)
+from model import code_dev_simulation
+
+STEPS = 200000
+EXP_CONDITION = 'delete_state'
+PREF_ATTACH_CONDITION = 0
+LAZY_AST = False
+BINS_PER_DECADE = 8 # Number of buckets per factor 10 of methods or edges
+MIN_BUCKET_SIZE = 20 # Buckets with fewer timed calls are left out of the fit
+
+def timed(action, model, records, overhead):
+    """
+    Wraps an action of the model, so every call is recorded as (methods, edges, seconds, rejected) in records
+
+    The time spent on counting the methods and edges is added to overhead[0], so it can be left out of the step time
+    """
+    @functools.wraps(action)
+    def timed_action():
+        start = time.perf_counter()
+        methods = len(model.store)
+        edges = int(model.store.out_degree[model.store.alive].sum())
+        counted = time.perf_counter()
+        change = action()
+        end = time.perf_counter()
+        records.append((methods, edges, end - counted, change == 0))
+        overhead[0] += counted - start + time.perf_counter() - end
+        return change
+    return timed_action
+
+def run(steps):
+    """
+    Runs the model for a number of steps, timing every step and every call of an action
+
+    Returns:
+        Dict from the action names and 'step' to arrays of the methods, edges, seconds and rejected flags
+    """
+    model = code_dev_simulation(steps, 0, dict(PROBABILITIES), EXP_CONDITION, ADD_STATE if EXP_CONDITION == 'delete_state' else 1,
+                                False, PREF_ATTACH_CONDITION, lazy_ast=LAZY_AST, seed=SEED, keep_lists=False)
+    records = {action.__name__: [] for action in model.possible_actions}
+    overhead = [0.0]
+    model.possible_actions = [timed(action, model, records[action.__name__], overhead) for action in model.possible_actions]
+
+    # The same loop as run_model(), with every step timed
+    records['step'] = []
+    while model.step_n < model.iterations:
+        methods = len(model.store)
+        edges = int(model.store.out_degree[model.store.alive].sum())
+        overhead[0] = 0.0
+        start = time.perf_counter()
+        model.step()
+        records['step'].append((methods, edges, time.perf_counter() - start - overhead[0], False))
+        model.step_n += 1
+
+    return {name: np.array(rows, dtype=float).reshape(-1, 4) for name, rows in records.items()}
+
+def buckets(sizes, seconds):
+    """
+    Bucket the times on a log scale of the sizes
+
+    Args:
+        sizes (np.array): Number of methods or edges at every call
+        seconds (np.array): Time of every call
+
+    Returns:
+        List of dicts with the median size, number of calls and the median and mean time of the buckets
+    """
+    sizes = np.maximum(sizes, 1)
+    bins = np.floor(np.log10(sizes) * BINS_PER_DECADE)
+    result = []
+    for value in np.unique(bins):
+        in_bin = bins == value
+        result.append({'size': float(np.median(sizes[in_bin])), 'calls': int(in_bin.sum()),
+                       'median_seconds': float(np.median(seconds[in_bin])), 'mean_seconds': float(seconds[in_bin].mean())})
+    return result
+
+def fit_exponent(size_buckets):
+    """
+    Fit seconds = a * size^exponent to the median times of the buckets with at least MIN_BUCKET_SIZE calls
+
+    Returns:
+        (exponent, a), or (None, None) if there are fewer than 3 buckets to fit
+    """
+    used = [bucket for bucket in size_buckets if bucket['calls'] >= MIN_BUCKET_SIZE and bucket['median_seconds'] > 0]
+    if len(used) < 3:
+        return None, None
+    exponent, log_a = np.polyfit(np.log([bucket['size'] for bucket in used]),
+                                 np.log([bucket['median_seconds'] for bucket in used]), 1)
+    return float(exponent), float(np.exp(log_a))
+
+def report(records, steps, run_seconds):
+    """
+    Returns the report of the scaling run: per action the calls, the buckets and the fitted exponents
+    for the number of methods and for the number of edges
+    """
+    result = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(),
+        'steps': steps, 'seed': SEED, 'exp_condition': EXP_CONDITION, 'pref_attach_condition': PREF_ATTACH_CONDITION,
+        'lazy_ast': LAZY_AST, 'run_seconds': run_seconds,
+        'actions': {}
+    }
+    for name, rows in records.items():
+        accepted = rows[rows[:, 3] == 0]
+        action = {'calls': len(rows), 'rejected': int(rows[:, 3].sum())}
+        for column, size_name in [(0, 'methods'), (1, 'edges')]:
+            size_buckets = buckets(accepted[:, column], accepted[:, 2])
+            exponent, constant = fit_exponent(size_buckets)
+            action[size_name] = {'exponent': exponent, 'constant': constant, 'buckets': size_buckets}
+        result['actions'][name] = action
+    return result
+
+def plot(result, filename):
+    """
+    Plot the median time per bucket and the fitted power laws of every action, versus methods and edges
+    """
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    for ax, size_name in zip(axes, ['methods', 'edges']):
+        for name, action in result['actions'].items():
+            size_buckets = [bucket for bucket in action[size_name]['buckets'] if bucket['calls'] >= MIN_BUCKET_SIZE]
+            if not size_buckets:
+                continue
+            sizes = np.array([bucket['size'] for bucket in size_buckets])
+            exponent = action[size_name]['exponent']
+            label = name if exponent is None else '{} (exponent {:.2f})'.format(name, exponent)
+            line, = ax.loglog(sizes, [bucket['median_seconds'] * 1e6 for bucket in size_buckets], 'o', label=label)
+            if exponent is not None:
+                ax.loglog(sizes, action[size_name]['constant'] * sizes ** exponent * 1e6, '-', color=line.get_color())
+        ax.set_xlabel('Number of ' + size_name)
+        ax.set_ylabel('Median time per call (µs)')
+        ax.legend(fontsize='small')
+    fig.suptitle('Cost per call versus code base size, {} steps'.format(result['steps']))
+    fig.tight_layout()
+    fig.savefig(filename)
+    plt.close(fig)
+
+def run_scaling(steps):
+    """
+    Runs the scaling benchmark, writes the report and the plot to RESULTS_DIR and prints the exponents
+
+    Returns:
+        The report
+    """
+    start = time.perf_counter()
+    records = run(steps)
+    result = report(records, steps, time.perf_counter() - start)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    basename = os.path.join(RESULTS_DIR, 'scaling_{}_{}'.format(datetime.datetime.now().strftime('%Y%m%d_%H%M%S'),
+                                                                (result['commit'] or 'unknown')[:8]))
+    with open(basename + '.json', 'w') as report_file:
+        json.dump(result, report_file, indent=2)
+    plot(result, basename + '.png')
+
+    for name, action in result['actions'].items():
+        print('{:<15} {:>8} calls, exponent methods: {}, edges: {}'.format(
+            name, action['calls'], format_exponent(action['methods']['exponent']), format_exponent(action['edges']['exponent'])))
+    print('Report written to {}.json and {}.png'.format(basename, basename))
+    return result
+
+def format_exponent(exponent):
+    """
+    Returns the exponent with two decimals, or - if it could not be fitted
+    """
+    return '-' if exponent is None else '{:.2f}'.format(exponent)
+
+if __name__ == "__main__":
+    run_scaling(int(sys.argv[1]) if len(sys.argv) > 1 else STEPS)
@@ -2,15 +2,174 @@ from plyj.model import MethodDeclaration, ClassDeclaration, Type, Name,\
                         MethodInvocation, VariableDeclaration, Variable,\
                         Literal, VariableDeclarator, ExpressionStatement
 
+class MethodIndex:
+    """
+    Index over the statements in the body of one method
+
+    The method calls in the body are kept per callee, so checking for or deleting a call does
+    not have to walk the body. The variable declarations are kept in a list that can be indexed
+    to pick one at random, a deleted declaration is replaced by the last one in the list.
+    Deleted statements are only marked as removed; the body list is compacted once the removed
+    statements outnumber the live ones, and before printing, so the order of the body is kept.
+
+    Args:
+        method: The method declaration to index
+    """
+    def __init__(self, method):
+        self.method = method
+        self.size = len(method.body)
+        self.calls = {}
+        self.declarations = []
+        self.positions = {}
+        self.removed = set()
+
+        for stmt in method.body:
+            if isinstance(stmt, ExpressionStatement) and isinstance(stmt.expression, MethodInvocation):
+                target = getattr(stmt.expression.target, 'value', None)
+                self.calls.setdefault((stmt.expression.name, target), []).append(stmt)
+            elif isinstance(stmt, VariableDeclaration):
+                self.add_declaration(stmt)
+
+    def add_declaration(self, stmt):
+        """
+        Add a variable declaration of the body to the declarations
+
+        Returns: void
+        """
+        self.positions[id(stmt)] = len(self.declarations)
+        self.declarations.append(stmt)
+
+    def remove_declaration(self, stmt):
+        """
+        Remove a variable declaration from the declarations by moving the last one into its slot
+
+        Returns:
+            (bool) True if the statement was one of the declarations
+        """
+        position = self.positions.pop(id(stmt), None)
+        if position is None:
+            return False
+        last = self.declarations.pop()
+        if position < len(self.declarations):
+            self.declarations[position] = last
+            self.positions[id(last)] = position
+        return True
+
+    def compact(self):
+        """
+        Drop the removed statements from the body of the method
+
+        Returns: void
+        """
+        if self.removed:
+            self.method.body[:] = [stmt for stmt in self.method.body if id(stmt) not in self.removed]
+            self.removed.clear()
+
+    def __getstate__(self):
+        # Ids do not survive pickling, store the removed statements by their position in the body
+        state = self.__dict__.copy()
+        state['removed'] = [i for i, stmt in enumerate(self.method.body) if id(stmt) in self.removed]
+        del state['positions']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.removed = {id(self.method.body[i]) for i in state['removed']}
+        self.positions = {id(stmt): i for i, stmt in enumerate(self.declarations)}
+
+
 class AST:
     """
     Main class to deal with the parsed .java file AST
 
     It can be used to create, update, remove, or call methods
     As well as creating and removing statements
+
+    Every method body gets a MethodIndex (by id of the method) the first time it is changed,
+    use body_size() for the number of statements and flush() before printing the code
     """
     def __init__(self):
         self.counter = 0
+        self.indices = {}
+
+    def __getstate__(self):
+        # The indices are keyed by id of the method, which changes when the AST is unpickled
+        return {'counter': self.counter, 'indices': list(self.indices.values())}
+
+    def __setstate__(self, state):
+        self.counter = state['counter']
+        self.indices = {id(index.method): index for index in state['indices']}
+
+    def method_index(self, method):
+        """
+        Get the index of a method, create it if the method has not been indexed yet
+
+        Args:
+            method: Method to get the index of
+
+        Returns:
+            MethodIndex of the method
+        """
+        index = self.indices.get(id(method))
+        if index is None:
+            index = self.indices[id(method)] = MethodIndex(method)
+        return index
+
+    def body_size(self, method):
+        """
+        Returns:
+            The number of statements in the body of a method
+        """
+        return self.method_index(method).size
+
+    def flush(self):
+        """
+        Compact the bodies of all methods, so the AST can be printed
+
+        Returns: void
+        """
+        for index in self.indices.values():
+            index.compact()
+
+    def load_classes(self, classes):
+        """
+        Take the classes of a parsed .java file into use
+
+        Args:
+            classes (list): Class declarations of the parsed file
+
+        Returns:
+            The classes to use in the simulation, here the parsed classes themselves
+        """
+        return classes
+
+    def materialize(self, classes):
+        """
+        Get the classes as plyj class declarations that can be printed
+
+        Args:
+            classes (list): Classes of the simulation
+
+        Returns:
+            List of class declarations
+        """
+        self.flush()
+        return classes
+
+    def class_methods(self, class_node):
+        """
+        Returns:
+            List of the methods in a class, in order of the class body
+        """
+        return [java_element for java_element in class_node.body if isinstance(java_element, MethodDeclaration)]
+
+    def declarations(self, method):
+        """
+        Returns:
+            List of the statements that can be deleted from a method (variable declarations), not in order
+            of the body. The list is the index of the method itself and should not be changed.
+        """
+        return self.method_index(method).declarations
 
     def create_method(self, class_node):
         """
@@ -47,6 +206,7 @@ class AST:
         Returns: void
         """
         class_node.body.remove(method)
+        self.indices.pop(id(method), None)
 
     def create_class(self, superclass_name=None):
         """
@@ -78,10 +238,28 @@ class AST:
         Returns:
             Created reference
         """
-        ref = MethodInvocation(callee_method.name, target=Name(callee_class.name))
-        caller_method.body.append(ExpressionStatement(ref))
+        index = self.method_index(caller_method)
+        stmt = self.method_call(callee_method.name, callee_class.name)
+        ref = stmt.expression
+        caller_method.body.append(stmt)
+        index.calls.setdefault((callee_method.name, callee_class.name), []).append(stmt)
+        index.size += 1
         return ref
 
+    def has_reference(self, caller_method, callee_method, callee_class):
+        """
+        Check whether a method already calls another method
+
+        Args:
+            caller_method: The method to make the method call from
+            callee_method: The method to call
+            callee_class: The class of the method to call
+
+        Returns:
+            (bool) True if the call is already made
+        """
+        return (callee_method.name, callee_class.name) in self.method_index(caller_method).calls
+
     def delete_reference(self, caller_method, callee_method, callee_class):
         """
         Delete a reference (method call) from a method in a class
@@ -91,19 +269,18 @@ class AST:
             callee_method: The method to call
             callee_class: The class of the method to call
 
-        Returns: void
+        Returns:
+            The number of deleted statements
         """
+        index = self.method_index(caller_method)
+        to_delete = index.calls.pop((callee_method.name, callee_class.name), [])
 
-        # Add all statements that have the correct name and class
-        to_delete = [stmt for stmt in caller_method.body
-                     if isinstance(stmt, ExpressionStatement) and
-                        isinstance(stmt.expression, MethodInvocation) and
-                        stmt.expression.name == callee_method.name and
-                        stmt.expression.target.value == callee_class.name]
-
-        # Delete all correct references
-        for stmt in to_delete:
-            caller_method.body.remove(stmt)
+        # Mark the references as removed and compact the body when it is mostly removed statements
+        index.removed.update(id(stmt) for stmt in to_delete)
+        index.size -= len(to_delete)
+        if len(index.removed) > index.size:
+            index.compact()
+        return len(to_delete)
 
     def add_statement(self, method):
         """
@@ -115,8 +292,11 @@ class AST:
         Returns: void
         """
 
+        index = self.method_index(method)
         stmt = self.create_statement()
         method.body.append(stmt)
+        index.add_declaration(stmt)
+        index.size += 1
 
     def create_statement(self):
         """
@@ -125,27 +305,63 @@ class AST:
         Returns:
             The created variable declaration statement
         """
-        var = VariableDeclaration(
+        var = self.variable_declaration(self.counter)
+        self.counter += 1
+        return var
+
+    @staticmethod
+    def variable_declaration(number):
+        """
+        Generate the variable declaration statement 'int var<number> = <number>;'
+
+        Args:
+            number (int): Number of the variable
+
+        Returns:
+            The variable declaration statement
+        """
+        return VariableDeclaration(
             # Create int
             type='int',
 
             # Declarate a variable with name counter and initialise with value counter
             variable_declarators=[VariableDeclarator(
                     variable=Variable(
-                    name='var' + str(self.counter)
+                    name='var' + str(number)
                 ),
-                initializer=Literal(self.counter)
+                initializer=Literal(number)
             )]
         )
-        self.counter += 1
-        return var
+
+    @staticmethod
+    def method_call(method_name, class_name):
+        """
+        Generate the statement '<class_name>.<method_name>();'
+
+        Args:
+            method_name (string): Name of the method to call
+            class_name (string): Name of the class of the method
+
+        Returns:
+            The expression statement with the method invocation
+        """
+        return ExpressionStatement(MethodInvocation(method_name, target=Name(class_name)))
 
     def delete_statement(self, method, statement):
         """
-        Delete a statement in a method body after finding it
+        Delete a variable declaration from a method body
+
+        The statement is marked as removed, like a deleted reference, so the body is not searched
+
+        Args:
+            method: Method to delete the statement from
+            statement: One of the declarations of the method
 
         Returns: void
         """
-        stmt = next((stmt for stmt in method.body if stmt == statement), None)
-        if stmt:
-            method.body.remove(stmt)
+        index = self.method_index(method)
+        if index.remove_declaration(statement):
+            index.removed.add(id(statement))
+            index.size -= 1
+            if len(index.removed) > index.size:
+                index.compact()
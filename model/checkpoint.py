@@ -0,0 +1,103 @@
+import os
+import pickle
+import time
+
+
+
+def save_checkpoint(model, filename):
+    """
+    Write the full state of a model to a checkpoint file
+
+    The recorder of the model is flushed first and the positions up to which the output file and the
+    gource log are written are stored with the model, so a resumed run can drop what was written after
+    the checkpoint. The checkpoint is written to a temporary file that replaces the previous checkpoint,
+    so a run that is killed while writing leaves the previous checkpoint intact.
+
+    Args:
+        model (code_dev_simulation): The model to save
+        filename (string): Name of the checkpoint file
+    """
+    write_checkpoint({
+        'model': model,
+        'position': model.recorder.position() if model.recorder is not None else None,
+        'log_position': model.log_writer.position() if model.log_writer is not None else None
+    }, filename)
+
+
+def load_checkpoint(filename):
+    """
+    Load a model from a checkpoint file and truncate its output file and the gource log to the
+    state of the checkpoint, run_model() continues the run from the checkpointed step
+
+    Args:
+        filename (string): Name of the checkpoint file
+
+    Returns:
+        The model
+    """
+    checkpoint = read_checkpoint(filename)
+    model = checkpoint['model']
+    if checkpoint['position'] is not None:
+        model.recorder.truncate(checkpoint['position'])
+    if checkpoint['log_position'] is not None:
+        model.log_writer.truncate(checkpoint['log_position'])
+    return model
+
+
+def write_checkpoint(data, filename):
+    """
+    Pickle data to a checkpoint file atomically: the data is written to a temporary file that
+    replaces the checkpoint file when it is completely written
+
+    Args:
+        data: Data to pickle
+        filename (string): Name of the checkpoint file
+    """
+    with open(filename + '.tmp', 'wb') as checkpoint_file:
+        pickle.dump(data, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(filename + '.tmp', filename)
+
+
+def read_checkpoint(filename):
+    """
+    Returns:
+        The data pickled in a checkpoint file
+    """
+    with open(filename, 'rb') as checkpoint_file:
+        return pickle.load(checkpoint_file)
+
+
+class Checkpointer:
+    """
+    Writes a checkpoint of a model every steps steps and/or every seconds seconds, used by run_model()
+
+    Args:
+        filename (string): Name of the checkpoint file
+        steps (int): Number of steps between checkpoints, None to not checkpoint on steps
+        seconds (float): Number of seconds between checkpoints, None to not checkpoint on time
+    """
+    def __init__(self, filename, steps=None, seconds=None):
+        self.filename = filename
+        self.steps = steps
+        self.seconds = seconds
+        self.last_time = time.time()
+
+    def step(self, model):
+        """
+        Write a checkpoint if it is due, called after every step of the model
+
+        Args:
+            model (code_dev_simulation): The model to checkpoint
+        """
+        if (self.steps and model.step_n % self.steps == 0) or \
+                (self.seconds and time.time() - self.last_time >= self.seconds):
+            self.save(model)
+
+    def save(self, model):
+        """
+        Write a checkpoint of the model
+        """
+        save_checkpoint(model, self.filename)
+        self.last_time = time.time()
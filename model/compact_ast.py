@@ -0,0 +1,315 @@
+from copy import copy
+
+from plyj.model import MethodDeclaration, ClassDeclaration, Type, Name, VariableDeclaration,\
+                        MethodInvocation, ExpressionStatement
+
+from AST import AST
+
+
+class CompactMethod:
+    """
+    Method of the compact AST
+
+    The body is an ordered dict from statement key to statement:
+        key >= 0: variable declaration 'int var<key> = <key>;', stored as None
+        key < 0: method call, stored as (method name, class name), or a statement of the parsed
+                 .java file, stored as the plyj statement itself
+
+    The keys of the variable declarations are also kept in a list that can be indexed to pick
+    one at random, a deleted declaration is replaced by the last one in the list.
+
+    Args:
+        name (string): Name of the method
+        declaration: The parsed method declaration this method was created from, if any
+    """
+    __slots__ = ('name', 'body', 'calls', 'declarations', 'positions', 'declaration')
+
+    def __init__(self, name, declaration=None):
+        self.name = name
+        self.body = {}
+        self.calls = {}
+        self.declarations = []
+        self.positions = {}
+        self.declaration = declaration
+
+    def add_declaration(self, key):
+        """
+        Add the key of a variable declaration of the body to the declarations
+
+        Returns: void
+        """
+        self.positions[key] = len(self.declarations)
+        self.declarations.append(key)
+
+    def remove_declaration(self, key):
+        """
+        Remove the key of a variable declaration by moving the last one into its slot
+
+        Returns:
+            (bool) True if the key was one of the declarations
+        """
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        last = self.declarations.pop()
+        if position < len(self.declarations):
+            self.declarations[position] = last
+            self.positions[last] = position
+        return True
+
+
+class CompactClass:
+    """
+    Class of the compact AST, the body is an ordered dict from method name to CompactMethod
+    (or a key to a non-method element of the parsed .java file)
+
+    Args:
+        name (string): Name of the class
+        declaration: The parsed class declaration this class was created from, if any
+    """
+    __slots__ = ('name', 'body', 'extends', 'declaration')
+
+    def __init__(self, name, declaration=None):
+        self.name = name
+        self.body = {}
+        self.extends = None
+        self.declaration = declaration
+
+
+class CompactAST:
+    """
+    Counts-only replacement for the AST class
+
+    Only the statement numbers and the calls between methods are stored, no plyj nodes are
+    created during the simulation. The counter is used in exactly the same way as by the AST
+    class, so materialize() reconstructs the plyj tree the AST class would have built,
+    with the same var<N>/Literal(N) statements.
+    """
+    def __init__(self):
+        self.counter = 0
+
+        # Keys of method calls and parsed statements count down, away from the statement numbers
+        self.next_key = -1
+
+    def load_classes(self, classes):
+        """
+        Convert the classes of a parsed .java file to compact classes
+
+        Args:
+            classes (list): Class declarations of the parsed file
+
+        Returns:
+            List of compact classes
+        """
+        compact_classes = []
+        for java_class in classes:
+            compact_class = CompactClass(java_class.name, java_class)
+            compact_class.extends = java_class.extends
+            for java_element in java_class.body:
+                if isinstance(java_element, MethodDeclaration):
+                    method = CompactMethod(java_element.name, java_element)
+                    for stmt in java_element.body or []:
+                        key = self.new_key()
+                        method.body[key] = stmt
+                        if isinstance(stmt, ExpressionStatement) and isinstance(stmt.expression, MethodInvocation):
+                            target = getattr(stmt.expression.target, 'value', None)
+                            method.calls.setdefault((stmt.expression.name, target), []).append(key)
+                        elif isinstance(stmt, VariableDeclaration):
+                            method.add_declaration(key)
+                    compact_class.body[method.name] = method
+                else:
+                    compact_class.body[self.new_key()] = java_element
+            compact_classes.append(compact_class)
+        return compact_classes
+
+    def materialize(self, classes):
+        """
+        Build the plyj class declarations of the compact classes, so they can be printed
+
+        Args:
+            classes (list): Compact classes of the simulation
+
+        Returns:
+            List of class declarations
+        """
+        java_classes = []
+        for compact_class in classes:
+            if compact_class.declaration is not None:
+                java_class = copy(compact_class.declaration)
+            else:
+                java_class = ClassDeclaration(compact_class.name, [])
+                if compact_class.extends:
+                    java_class.extends = Type(Name(compact_class.extends))
+            java_class.body = [self.materialize_method(element) if isinstance(element, CompactMethod) else element
+                               for element in compact_class.body.values()]
+            java_classes.append(java_class)
+        return java_classes
+
+    def materialize_method(self, method):
+        """
+        Build the plyj method declaration of a compact method
+
+        Args:
+            method (CompactMethod): The method to build
+
+        Returns:
+            Method declaration with all statements
+        """
+        if method.declaration is not None:
+            java_method = copy(method.declaration)
+        else:
+            java_method = MethodDeclaration(method.name, body=[], modifiers=['static'])
+
+        body = []
+        for key, stmt in method.body.items():
+            if stmt is None:
+                body.append(AST.variable_declaration(key))
+            elif isinstance(stmt, tuple):
+                body.append(AST.method_call(*stmt))
+            else:
+                body.append(stmt)
+        java_method.body = body
+        return java_method
+
+    def new_key(self):
+        """
+        Returns:
+            A new key for a statement that is not a variable declaration
+        """
+        key = self.next_key
+        self.next_key -= 1
+        return key
+
+    def body_size(self, method):
+        """
+        Returns:
+            The number of statements in the body of a method
+        """
+        return len(method.body)
+
+    def flush(self):
+        """
+        Nothing to compact in the compact AST, use materialize() to get printable classes
+
+        Returns: void
+        """
+
+    def class_methods(self, class_node):
+        """
+        Returns:
+            List of the methods in a class, in order of the class body
+        """
+        return [element for element in class_node.body.values() if isinstance(element, CompactMethod)]
+
+    def declarations(self, method):
+        """
+        Returns:
+            List of the keys of the statements that can be deleted from a method, not in order of the body.
+            The list is the index of the method itself and should not be changed.
+        """
+        return method.declarations
+
+    def create_method(self, class_node):
+        """
+        Create a static method with an empty body in a class
+
+        Args:
+            class_node: Class to create the method in
+
+        Returns:
+            Newly created method
+        """
+        method = CompactMethod('method_' + str(self.counter))
+        self.counter += 1
+        class_node.body[method.name] = method
+        return method
+
+    def delete_method(self, class_node, method):
+        """
+        Delete a method from a class
+
+        Args:
+            class_node: Class to remove method in
+            method: Method to remove in class_node
+
+        Returns: void
+        """
+        del class_node.body[method.name]
+
+    def create_class(self, superclass_name=None):
+        """
+        Creates an empty class, which extends the superclass if its name is provided
+
+        Args:
+            superclass_name: The name of the superclass to extend, default value: None
+
+        Returns:
+            Created class
+        """
+        compact_class = CompactClass('Class_' + str(self.counter))
+        compact_class.extends = superclass_name
+        self.counter += 1
+        return compact_class
+
+    def create_reference(self, caller_method, callee_method, callee_class):
+        """
+        Create a reference (call a method) from a method
+
+        Args:
+            caller_method: The method to make the method call from
+            callee_method: The method to call
+            callee_class: The class of the method to call
+
+        Returns:
+            Key of the created call statement
+        """
+        key = self.new_key()
+        call = (callee_method.name, callee_class.name)
+        caller_method.body[key] = call
+        caller_method.calls.setdefault(call, []).append(key)
+        return key
+
+    def has_reference(self, caller_method, callee_method, callee_class):
+        """
+        Returns:
+            (bool) True if the caller already calls the method
+        """
+        return (callee_method.name, callee_class.name) in caller_method.calls
+
+    def delete_reference(self, caller_method, callee_method, callee_class):
+        """
+        Delete all calls to a method from the caller
+
+        Returns:
+            The number of deleted statements
+        """
+        to_delete = caller_method.calls.pop((callee_method.name, callee_class.name), [])
+        for key in to_delete:
+            del caller_method.body[key]
+        return len(to_delete)
+
+    def add_statement(self, method):
+        """
+        Add a variable declaration statement to the body of a method
+
+        Args:
+            Method to add the statement to
+
+        Returns: void
+        """
+        method.body[self.counter] = None
+        method.add_declaration(self.counter)
+        self.counter += 1
+
+    def delete_statement(self, method, statement):
+        """
+        Delete a statement from a method
+
+        Args:
+            method: Method to delete the statement from
+            statement: Key of one of the declarations of the method
+
+        Returns: void
+        """
+        if method.remove_declaration(statement):
+            del method.body[statement]
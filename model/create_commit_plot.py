@@ -4,8 +4,10 @@ import numpy as np
 import sys
 import os
 
+from trace_file import read_results
+
 def convert(filename):
-    data = pd.read_csv(filename)
+    data = read_results(filename)
     commits = get_lines_for_data(data, .5)
     df = pd.DataFrame(commits[0][3], columns=["colummn"])
     os.makedirs('./output/csv', exist_ok=True)
@@ -0,0 +1,80 @@
+class DirectoryIndex:
+    """
+    Map from class name to the directory of the class in the gource log, which can be sampled in O(1)
+
+    Used like the dict it replaces (index[name] = directory, index[name], del index[name]). The
+    non-empty directories are also kept in a list with one entry per class, a class is removed by
+    moving the last entry into its slot. The classes in the root directory ('') are only counted,
+    so a directory can be sampled uniformly over the classes without building a list of all
+    directories, also with one of the '' entries left out.
+    """
+    def __init__(self):
+        self.directories = {}
+        self.paths = []
+        self.names = []
+        self.positions = {}
+        self.empty = 0
+
+    def __len__(self):
+        return len(self.directories)
+
+    def __contains__(self, name):
+        return name in self.directories
+
+    def __getitem__(self, name):
+        return self.directories[name]
+
+    def __setitem__(self, name, directory):
+        if name in self.directories:
+            del self[name]
+        self.directories[name] = directory
+        if directory == '':
+            self.empty += 1
+        else:
+            self.positions[name] = len(self.paths)
+            self.paths.append(directory)
+            self.names.append(name)
+
+    def __delitem__(self, name):
+        directory = self.directories.pop(name)
+        if directory == '':
+            self.empty -= 1
+            return
+
+        # Move the last entry into the slot of the removed class
+        position = self.positions.pop(name)
+        last_path = self.paths.pop()
+        last_name = self.names.pop()
+        if position < len(self.paths):
+            self.paths[position] = last_path
+            self.names[position] = last_name
+            self.positions[last_name] = position
+
+    def sample(self, u):
+        """
+        Uniformly sample the directory of a class
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+
+        Returns:
+            The directory
+        """
+        position = int(u * len(self.directories))
+        return self.paths[position] if position < len(self.paths) else ''
+
+    def sample_excluding_empty(self, u):
+        """
+        Uniformly sample the directory of a class, with one of the classes in the root directory ('') left out
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+
+        Returns:
+            The directory, or None if there are no directories left to sample from
+        """
+        size = len(self.directories) - (1 if self.empty else 0)
+        if size == 0:
+            return None
+        position = int(u * size)
+        return self.paths[position] if position < len(self.paths) else ''
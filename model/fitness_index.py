@@ -0,0 +1,180 @@
+from array import array
+
+
+class FitnessIndex:
+    """
+    Indexed binary min-heap that keeps the methods of a store ordered on their fitness
+
+    The heap holds only the method ids, the fitness itself is kept in the fitness array of the
+    store, so every fitness is stored once. The position of every id in the heap is remembered,
+    so the fitness of a method can be changed (decrease/increase-key) or the method can be
+    removed in O(log n), while the least fit method is available in O(1)
+
+    Args:
+        store (MethodStore): Store with the fitness array, indexed by the method ids
+        reverse (bool): If True, the heap keeps the maximum on top instead of the minimum
+    """
+    def __init__(self, store, reverse=False):
+        self.store = store
+        self.sign = -1 if reverse else 1
+        self.heap = []
+        # Position in the heap per id, -1 for ids that are not in the heap
+        self.positions = array('i')
+        self.view = None
+
+    def __getstate__(self):
+        # A memoryview can not be pickled, it is made again when it is used
+        state = self.__dict__.copy()
+        state['view'] = None
+        return state
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return key < len(self.positions) and self.positions[key] >= 0
+
+    def push(self, key, fitness):
+        """
+        Add a method with its fitness to the index, or update it if it is already present
+        The fitness is written to the store
+
+        Args:
+            key (int): Id of the method
+            fitness (float): Fitness of the method
+        """
+        if key >= len(self.positions):
+            self.positions.extend([-1] * (key + 1 - len(self.positions)))
+        elif self.positions[key] >= 0:
+            self.update(key, fitness)
+            return
+        fitnesses = self._fitness()
+        fitnesses[key] = fitness
+        self.heap.append(key)
+        self.positions[key] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1, fitnesses)
+
+    def update(self, key, fitness):
+        """
+        Change the fitness of a method that is already in the index
+        The fitness is written to the store
+
+        Args:
+            key (int): Id of the method
+            fitness (float): New fitness of the method
+        """
+        fitnesses = self._fitness()
+        change = self.sign * (fitness - fitnesses[key])
+        fitnesses[key] = fitness
+        position = self.positions[key]
+        if change < 0:
+            self._sift_up(position, fitnesses)
+        elif change > 0:
+            self._sift_down(position, fitnesses)
+        else:
+            # Another index over the store can have written the fitness already, sift the method
+            # up, and down if it did not move up
+            self._sift_up(position, fitnesses)
+            if self.positions[key] == position:
+                self._sift_down(position, fitnesses)
+
+    def remove(self, key):
+        """
+        Remove a method from the index
+
+        Args:
+            key (int): Id of the method
+        """
+        position = self.positions[key]
+        self.positions[key] = -1
+        last = self.heap.pop()
+        if position == len(self.heap):
+            return
+
+        # Move the last entry into the hole and restore the heap property
+        self.heap[position] = last
+        self.positions[last] = position
+        fitnesses = self._fitness()
+        self._sift_up(position, fitnesses)
+        self._sift_down(self.positions[last], fitnesses)
+
+    def top(self):
+        """
+        Returns:
+            (key, fitness) of the least fit method, or (None, None) if the index is empty
+        """
+        if not self.heap:
+            return None, None
+        key = self.heap[0]
+        return key, self.store.fitness[key]
+
+    def fitness(self, key):
+        """
+        Returns:
+            The fitness stored for a method
+        """
+        return self.store.fitness[key]
+
+    def values(self):
+        """
+        Returns:
+            Generator over all stored fitnesses, in heap order
+        """
+        fitness = self.store.fitness
+        return (fitness[key] for key in self.heap)
+
+    def _fitness(self):
+        """
+        Returns:
+            A memoryview of the fitness array of the store, its items are read as floats several times
+            faster than the items of the NumPy array
+        """
+        if self.view is None or self.view.obj is not self.store.fitness:
+            # The store replaces its arrays when it grows
+            self.view = memoryview(self.store.fitness)
+        return self.view
+
+    def _sift_up(self, position, fitness):
+        # Move the parents with a higher value down into the hole, then put the method in the hole
+        heap = self.heap
+        positions = self.positions
+        sign = self.sign
+        key = heap[position]
+        value = sign * fitness[key]
+        while position > 0:
+            parent = (position - 1) >> 1
+            parent_key = heap[parent]
+            if not value < sign * fitness[parent_key]:
+                break
+            heap[position] = parent_key
+            positions[parent_key] = position
+            position = parent
+        heap[position] = key
+        positions[key] = position
+
+    def _sift_down(self, position, fitness):
+        # Move the smallest child up into the hole while it has a lower value, then put the method in the hole
+        heap = self.heap
+        positions = self.positions
+        sign = self.sign
+        size = len(heap)
+        key = heap[position]
+        value = sign * fitness[key]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            child_key = heap[child]
+            child_value = sign * fitness[child_key]
+            if child + 1 < size:
+                right_key = heap[child + 1]
+                right_value = sign * fitness[right_key]
+                if right_value < child_value:
+                    child, child_key, child_value = child + 1, right_key, right_value
+            if not child_value < value:
+                break
+            heap[position] = child_key
+            positions[child_key] = position
+            position = child
+        heap[position] = key
+        positions[key] = position
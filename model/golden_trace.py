@@ -0,0 +1,208 @@
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.stats import ks_2samp
+
+from model import code_dev_simulation
+from trace_file import ACTION_CODES
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test', 'golden_trace.npz')
+
+STEPS = 2000
+SEEDS = [1, 2]
+CONDITIONS = [(exp_condition, pref_attach_condition) for exp_condition in ['reproduce', 'no_rec', 'delete_state']
+              for pref_attach_condition in [0, 1, 2, 3]]
+PROBABILITIES = {
+    'create_method': 0.1,
+    'call_method': 0.4,
+    'update_method': 0.45,
+    'delete_method': 0.05,
+    'create_class': 0.1
+}
+ADD_STATE = .8 # Prob of adding statement vs deleting, in the delete_state condition
+
+# Columns of a trace, one value per step
+COLUMNS = ['action', 'changes', 'fmin', 'code_size', 'methods']
+
+# Keyword arguments of code_dev_simulation per engine. Exact engines must reproduce the golden trace step
+# by step, the other engines draw their random numbers in another order and are compared on distributions
+ENGINES = {
+    'default': {},
+    'lazy_ast': {'lazy_ast': True},
+    'rejection_free': {'rejection_free': True},
+    'lazy_ast_rejection_free': {'lazy_ast': True, 'rejection_free': True}
+}
+EXACT_ENGINES = ['default', 'lazy_ast']
+KS_ALPHA = 0.01 # Distributions that differ with a lower p-value fail the comparison
+F0 = .5 # Fitness threshold of a commit, as in create_commit_plot.py
+
+
+def record_trace(exp_condition, pref_attach_condition, seed, steps=STEPS, **engine):
+    """
+    Run a simulation and record its canonical trace
+
+    Args:
+        exp_condition (string): Experiment condition
+        pref_attach_condition (int): Preferential attachment condition
+        seed (int): Seed of the simulation
+        steps (int): Number of steps
+        engine: Keyword arguments of code_dev_simulation that select the engine, e.g. lazy_ast=True
+
+    Returns:
+        Dict from the COLUMNS to arrays with the value of every step
+    """
+    model = code_dev_simulation(steps, 0, dict(PROBABILITIES), exp_condition,
+                                ADD_STATE if exp_condition == 'delete_state' else 1, False, pref_attach_condition,
+                                seed=seed, **engine)
+    model.run_model()
+    return {
+        'action': np.array([ACTION_CODES[action] for action in model.list_action], dtype=np.int8),
+        'changes': np.array(model.changes, dtype=np.int32),
+        'fmin': np.array(model.list_fmin, dtype=np.float64),
+        'code_size': np.array(model.total_code_size, dtype=np.int64),
+        'methods': np.array([fit_stats[0] for fit_stats in model.list_fit_stats], dtype=np.int32)
+    }
+
+
+def trace_name(exp_condition, pref_attach_condition, seed):
+    """
+    Returns:
+        Name of the trace of a condition and seed in a golden file
+    """
+    return '{}_{}_{}'.format(exp_condition, pref_attach_condition, seed)
+
+
+def record_golden(filename=GOLDEN_FILE, steps=STEPS, seeds=SEEDS):
+    """
+    Record the traces of the default engine for every condition and seed, and write them to a golden file
+
+    The golden file is an .npz archive with an array '<trace name>/<column>' per trace and column, and the
+    parameters of the traces as json in 'metadata'
+    """
+    arrays = {}
+    for exp_condition, pref_attach_condition in CONDITIONS:
+        for seed in seeds:
+            trace = record_trace(exp_condition, pref_attach_condition, seed, steps)
+            for column in COLUMNS:
+                arrays[trace_name(exp_condition, pref_attach_condition, seed) + '/' + column] = trace[column]
+    metadata = {'steps': steps, 'seeds': list(seeds), 'probabilities': PROBABILITIES, 'add_state': ADD_STATE}
+    np.savez_compressed(filename, metadata=np.array(json.dumps(metadata)), **arrays)
+
+
+def read_golden(filename=GOLDEN_FILE):
+    """
+    Read a golden file written by record_golden()
+
+    Returns:
+        (metadata dict, dict from trace name to its trace)
+    """
+    with np.load(filename) as archive:
+        metadata = json.loads(str(archive['metadata']))
+        traces = {}
+        for key in archive.files:
+            if key != 'metadata':
+                name, column = key.split('/')
+                traces.setdefault(name, {})[column] = archive[key]
+    return metadata, traces
+
+
+def compare_exact(golden, trace):
+    """
+    Compare a trace with a golden trace step by step
+
+    Returns:
+        List of 'column: step' for every column that differs, with the first step that differs
+    """
+    differences = []
+    for column in COLUMNS:
+        expected, actual = golden[column], trace[column]
+        if len(expected) != len(actual):
+            differences.append('{}: {} steps instead of {}'.format(column, len(actual), len(expected)))
+            continue
+        differs = np.flatnonzero(expected != actual)
+        if len(differs):
+            differences.append('{}: step {}'.format(column, differs[0]))
+    return differences
+
+
+def commit_sizes(trace, f0=F0):
+    """
+    Commit sizes of a trace, like lines_per_commit() of create_commit_plot.py: a commit is made at every
+    step with fmin >= f0, its size is max(inserted, deleted) lines since the previous commit
+
+    Returns:
+        Array with the size of every commit
+    """
+    size_changes = np.diff(trace['code_size'], prepend=0)
+    sizes = []
+    previous = 0
+    for commit in np.flatnonzero(trace['fmin'] >= f0):
+        changes = size_changes[previous:commit]
+        sizes.append(max(changes[changes > 0].sum(), -changes[changes < 0].sum()))
+        previous = commit
+    return np.array(sizes, dtype=np.int64)
+
+
+def compare_distribution(golden_traces, traces, alpha=KS_ALPHA):
+    """
+    Compare the traces of a condition with the golden traces with two-sample Kolmogorov-Smirnov tests
+    of the commit sizes and of the changes per step. The traces of all seeds are pooled.
+
+    The sizes are discrete, so the tests are conservative: they catch a changed model (e.g. other
+    probabilities), not a small shift of the distributions
+
+    Returns:
+        List of '<distribution>: KS statistic, p-value' for every distribution that differs significantly at alpha
+    """
+    differences = []
+    for name, statistic in [('commit sizes', commit_sizes), ('changes', lambda trace: trace['changes'])]:
+        result = ks_2samp(np.concatenate([statistic(golden) for golden in golden_traces]),
+                          np.concatenate([statistic(trace) for trace in traces]))
+        if result.pvalue < alpha:
+            differences.append('{}: KS statistic {:.3f}, p-value {:.2g}'.format(name, result.statistic, result.pvalue))
+    return differences
+
+
+def check_engine(engine, filename=GOLDEN_FILE):
+    """
+    Replay every condition and seed of a golden file with an engine and compare it with the golden traces,
+    step by step for the EXACT_ENGINES and on the distributions of the commit sizes and changes for the others
+
+    Args:
+        engine (string): Name of one of the ENGINES
+
+    Returns:
+        Dict from the conditions as '<exp_condition>_<pref_attach_condition>' to a list of the differences,
+        empty if the condition passed
+    """
+    metadata, golden = read_golden(filename)
+    failures = {}
+    for exp_condition, pref_attach_condition in CONDITIONS:
+        names = [trace_name(exp_condition, pref_attach_condition, seed) for seed in metadata['seeds']]
+        traces = [record_trace(exp_condition, pref_attach_condition, seed, metadata['steps'], **ENGINES[engine])
+                  for seed in metadata['seeds']]
+        if engine in EXACT_ENGINES:
+            differences = ['seed {}: {}'.format(seed, difference)
+                           for seed, name, trace in zip(metadata['seeds'], names, traces)
+                           for difference in compare_exact(golden[name], trace)]
+        else:
+            differences = compare_distribution([golden[name] for name in names], traces)
+        failures['{}_{}'.format(exp_condition, pref_attach_condition)] = differences
+    return failures
+
+
+if __name__ == "__main__":
+    # python golden_trace.py record           Record the golden traces with the default engine
+    # python golden_trace.py [engine ...]     Check engines against the golden traces, all engines by default
+    if sys.argv[1:] == ['record']:
+        record_golden()
+        print('Golden traces written to {}'.format(GOLDEN_FILE))
+    else:
+        failed = False
+        for engine in sys.argv[1:] or ENGINES:
+            for condition, differences in check_engine(engine).items():
+                print('{} {}: {}'.format(engine, condition, 'ok' if not differences else ', '.join(differences)))
+                failed = failed or bool(differences)
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,77 @@
+import json
+import time
+from collections import Counter, defaultdict
+
+PHASES = ['selection', 'mutation', 'recording']
+
+
+class Instrumentation:
+    """
+    Call counts and wall times of the simulation loop, filled by the step() of a model that was given an instance
+
+    Every step is split into the phases:
+        selection: sampling the action (and its probabilities)
+        mutation: running the action, also when it made no change and is rejected
+        recording: save_states()
+    The mutation time is also kept per action.
+    """
+    def __init__(self):
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.action_calls = Counter()
+        self.action_seconds = defaultdict(float)
+
+    def time_phase(self, phase, start):
+        """
+        Add the time since start to a phase
+
+        Args:
+            phase (string): One of PHASES
+            start (float): time.perf_counter() at the start of the phase
+
+        Returns:
+            time.perf_counter() at the end of the phase, the start of the next phase
+        """
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - start
+        return now
+
+    def time_action(self, name, start):
+        """
+        Count a call of an action and add the time since start to the action and the mutation phase
+
+        Args:
+            name (string): Name of the action
+            start (float): time.perf_counter() at the start of the action
+
+        Returns:
+            time.perf_counter() at the end of the action
+        """
+        now = time.perf_counter()
+        self.action_calls[name] += 1
+        self.action_seconds[name] += now - start
+        self.phase_seconds['mutation'] += now - start
+        return now
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the total time, the time per phase and the calls and time per action
+        """
+        return {
+            'seconds': sum(self.phase_seconds.values()),
+            'phases': dict(self.phase_seconds),
+            'actions': {name: {'calls': calls, 'seconds': self.action_seconds[name]}
+                        for name, calls in sorted(self.action_calls.items())}
+        }
+
+
+def write_summary(summary, filename):
+    """
+    Write a summary dict (e.g. of code_dev_simulation.instrumentation_summary()) to a JSON file
+
+    Args:
+        summary (dict): The summary to write
+        filename (string): Name of the JSON file
+    """
+    with open(filename, 'w') as summary_file:
+        json.dump(summary, summary_file, indent=2)
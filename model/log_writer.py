@@ -0,0 +1,133 @@
+import gzip
+import os
+import time
+from queue import Queue
+from threading import Thread
+
+from step_recorder import truncate_file
+
+
+class LogWriter:
+    """
+    Buffered writer for the gource log
+
+    The log file is kept open and lines are buffered and written in batches, every flush_lines
+    lines and/or every flush_seconds seconds. With background=True the batches are written by a
+    background thread, so the simulation does not wait for the writes. A filename ending with
+    .gz writes a gzip compressed log.
+
+    Args:
+        filename (string): Name of the log file
+        mode (string): 'w' to start a new log, 'a' to append to an existing log
+        flush_lines (int): Number of buffered lines after which they are written
+        flush_seconds (float): Number of seconds after which the buffered lines are written, None to only flush on lines
+        background (bool): Write the batches from a background thread
+    """
+    def __init__(self, filename, mode='w', flush_lines=1000, flush_seconds=None, background=False):
+        self.filename = filename
+        self.compress = filename.endswith('.gz')
+        self.flush_lines = flush_lines
+        self.flush_seconds = flush_seconds
+        self.background = background
+        self.lines = []
+        self.handle = None
+        self.open(mode)
+
+    def open(self, mode='a'):
+        """
+        Open the log file, and start the background thread
+        """
+        self.handle = gzip.open(self.filename, mode + 't') if self.compress else open(self.filename, mode)
+        self.last_flush = time.time()
+        self.queue = None
+        if self.background:
+            self.queue = Queue()
+            self.thread = Thread(target=self._drain, args=(self.queue, self.handle), daemon=True)
+            self.thread.start()
+
+    def write(self, line):
+        """
+        Add a line (including the newline) to the log, a closed log is opened again to append to it
+        """
+        if self.handle is None:
+            self.open('a')
+        self.lines.append(line)
+        if len(self.lines) >= self.flush_lines or \
+                (self.flush_seconds is not None and time.time() - self.last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered lines, or hand them to the background thread
+        """
+        if self.lines:
+            if self.queue is not None:
+                self.queue.put(self.lines)
+            else:
+                self.handle.write(''.join(self.lines))
+            self.lines = []
+        self.last_flush = time.time()
+
+    def close(self):
+        """
+        Write all buffered lines, stop the background thread and close the file
+        """
+        if self.handle is None:
+            return
+        self.flush()
+        if self.queue is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.queue = None
+        self.handle.close()
+        self.handle = None
+
+    def position(self):
+        """
+        Write all lines and return the size of the log file, e.g. to store it in a checkpoint
+        The file is closed and opened again, so a gzip log is a complete gzip member at this position
+
+        Returns:
+            Size of the log file in bytes
+        """
+        reopen = self.handle is not None
+        self.close()
+        position = os.path.getsize(self.filename)
+        if reopen:
+            self.open('a')
+        return position
+
+    def truncate(self, position):
+        """
+        Drop the log written after a position returned by position(), e.g. when resuming from a checkpoint
+        """
+        self.lines = []
+        self.close()
+        truncate_file(self.filename, position)
+        self.open('a')
+
+    def __getstate__(self):
+        # The file and the thread are not pickled, they are opened again when unpickling
+        if self.handle is not None:
+            self.close()
+            self.open('a')
+        state = self.__dict__.copy()
+        state['reopen'] = self.handle is not None
+        for name in ['handle', 'queue', 'thread']:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        reopen = state.pop('reopen')
+        self.__dict__.update(state)
+        self.handle = None
+        self.queue = None
+        if reopen:
+            self.open('a')
+
+    def _drain(self, queue, handle):
+        while True:
+            lines = queue.get()
+            if lines is None:
+                break
+            handle.write(''.join(lines))
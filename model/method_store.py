@@ -0,0 +1,251 @@
+from array import array
+
+import numpy as np
+from networkx import DiGraph
+
+
+class MethodStore:
+    """
+    Struct-of-arrays store for the methods of the simulation
+
+    Every method gets an integer id, which indexes the NumPy arrays with its fitness, lines,
+    body size, class id and in- and out-degree. Ids of deleted methods are reused through a
+    free-list, the arrays double in size when they are full.
+    The calls between methods are kept as a compact array of the callers and one of the callees per id,
+    in the order the calls were made. The call graph is sparse, so a linear scan of these arrays is cheap.
+    A networkx graph is only built on demand by to_graph(). The methods are also kept per number
+    of other methods they call, so the callers that call every other method are known directly.
+
+    Args:
+        capacity (int): Initial number of method slots
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.fitness = np.zeros(capacity)
+        self.lines = np.zeros(capacity, dtype=np.int64)
+        self.body_size = np.zeros(capacity, dtype=np.int64)
+        self.class_id = np.full(capacity, -1, dtype=np.int32)
+        self.in_degree = np.zeros(capacity, dtype=np.int32)
+        self.out_degree = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self.methods = [None] * capacity
+        self.callers = [None] * capacity
+        self.callees = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+        # Ordered sets (dicts) of method ids by the number of callees other than the method itself
+        self.callers_by_degree = {}
+
+        # Classes get an id as well, ids of removed classes are reused
+        self.class_nodes = []
+        self.free_classes = []
+
+    def __len__(self):
+        return self.count
+
+    def add(self, method, class_id, fitness, body_size=0):
+        """
+        Add a method to the store
+
+        Args:
+            method: The method declaration in the AST
+            class_id (int): Id of the class of the method
+            fitness (float): Fitness of the method
+            body_size (int): Number of statements in the body of the method
+
+        Returns:
+            Id of the method
+        """
+        if not self.free:
+            self._grow()
+        method_id = self.free.pop()
+        self.methods[method_id] = method
+        self.callers[method_id] = array('i')
+        self.callees[method_id] = array('i')
+        self.fitness[method_id] = fitness
+        self.lines[method_id] = 0
+        self.body_size[method_id] = body_size
+        self.class_id[method_id] = class_id
+        self.in_degree[method_id] = 0
+        self.out_degree[method_id] = 0
+        self.alive[method_id] = True
+        self.count += 1
+        self._move_degree(method_id, None, 0)
+        return method_id
+
+    def remove(self, method_id):
+        """
+        Remove a method and all calls from and to it
+
+        Args:
+            method_id (int): Id of the method
+        """
+        self._move_degree(method_id, self.other_degree(method_id), None)
+        for caller in self.callers[method_id]:
+            if caller != method_id:
+                self.callees[caller].remove(method_id)
+                self.out_degree[caller] -= 1
+                degree = self.other_degree(caller)
+                self._move_degree(caller, degree + 1, degree)
+        for callee in self.callees[method_id]:
+            if callee != method_id:
+                self.callers[callee].remove(method_id)
+                self.in_degree[callee] -= 1
+
+        self.methods[method_id] = None
+        self.callers[method_id] = None
+        self.callees[method_id] = None
+        self.alive[method_id] = False
+        self.class_id[method_id] = -1
+        self.free.append(method_id)
+        self.count -= 1
+
+    def add_edge(self, caller, callee):
+        """
+        Add a call from caller to callee, if it does not exist yet
+
+        Args:
+            caller (int): Id of the calling method
+            callee (int): Id of the called method
+
+        Returns:
+            (bool) True if the call is new
+        """
+        if callee in self.callees[caller]:
+            return False
+        self.callees[caller].append(callee)
+        self.callers[callee].append(caller)
+        self.out_degree[caller] += 1
+        self.in_degree[callee] += 1
+        if callee != caller:
+            degree = self.other_degree(caller)
+            self._move_degree(caller, degree - 1, degree)
+        return True
+
+    def has_edge(self, caller, callee):
+        """
+        Returns:
+            (bool) True if caller calls callee
+        """
+        return callee in self.callees[caller]
+
+    def other_degree(self, method_id):
+        """
+        Returns:
+            The number of methods other than itself that a method calls
+        """
+        return int(self.out_degree[method_id]) - (1 if method_id in self.callees[method_id] else 0)
+
+    def saturated_callers(self):
+        """
+        Returns:
+            Ordered set (dict) of the ids of the methods that already call every other method
+        """
+        return self.callers_by_degree.get(self.count - 1, {})
+
+    def _move_degree(self, method_id, old, new):
+        """
+        Move a method from the set of its old number of other callees to the new one, None for no set
+        """
+        if old is not None:
+            methods = self.callers_by_degree[old]
+            del methods[method_id]
+            if not methods:
+                del self.callers_by_degree[old]
+        if new is not None:
+            self.callers_by_degree.setdefault(new, {})[method_id] = True
+
+    def add_class(self, class_node):
+        """
+        Register a class
+
+        Args:
+            class_node: The class declaration in the AST
+
+        Returns:
+            Id of the class
+        """
+        if self.free_classes:
+            class_id = self.free_classes.pop()
+            self.class_nodes[class_id] = class_node
+        else:
+            class_id = len(self.class_nodes)
+            self.class_nodes.append(class_node)
+        return class_id
+
+    def remove_class(self, class_id):
+        """
+        Unregister a class, its id can be reused
+
+        Args:
+            class_id (int): Id of the class
+        """
+        self.class_nodes[class_id] = None
+        self.free_classes.append(class_id)
+
+    def class_of(self, method_id):
+        """
+        Returns:
+            The class declaration of a method
+        """
+        return self.class_nodes[self.class_id[method_id]]
+
+    def ids(self):
+        """
+        Returns:
+            NumPy array with the ids of all methods in the store
+        """
+        return np.flatnonzero(self.alive)
+
+    def fitness_stats(self):
+        """
+        Vectorised (exact) statistics of the fitnesses
+
+        Returns a list of count, mean, std, min, max values
+        """
+        fitnesses = self.fitness[self.alive]
+        return [len(fitnesses), fitnesses.mean(), fitnesses.std(), fitnesses.min(), fitnesses.max()]
+
+    def total_lines(self):
+        """
+        Returns:
+            The summed lines of all methods
+        """
+        return int(self.lines[self.alive].sum())
+
+    def to_graph(self):
+        """
+        Build the reference graph as a networkx DiGraph, with the method names as nodes and
+        the method, class, fitness and lines of every method as node data
+
+        Returns:
+            DiGraph of the calls between methods
+        """
+        graph = DiGraph()
+        for method_id in self.ids():
+            graph.add_node(self.methods[method_id].name, data={
+                'method': self.methods[method_id], 'class': self.class_of(method_id),
+                'fitness': float(self.fitness[method_id]), 'lines': int(self.lines[method_id])})
+        for method_id in self.ids():
+            for callee in self.callees[method_id]:
+                graph.add_edge(self.methods[method_id].name, self.methods[callee].name)
+        return graph
+
+    def _grow(self):
+        """
+        Double the capacity of the store
+        """
+        old_capacity = self.capacity
+        self.capacity *= 2
+        for name in ['fitness', 'lines', 'body_size', 'class_id', 'in_degree', 'out_degree', 'alive']:
+            array = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=array.dtype)
+            grown[:old_capacity] = array
+            setattr(self, name, grown)
+        self.class_id[old_capacity:] = -1
+        self.methods += [None] * old_capacity
+        self.callers += [None] * old_capacity
+        self.callees += [None] * old_capacity
+        self.free = list(range(self.capacity - 1, old_capacity - 1, -1)) + self.free
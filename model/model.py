@@ -1,25 +1,31 @@
 ### External imports
 # Standard imports
-import numpy as np
 import pandas as pd
 from os import path
 import time
+from collections import Counter
 
 # Specific imports
-from plyj.model import MethodDeclaration, VariableDeclaration, MethodInvocation, ExpressionStatement
 from plyj.parser import Parser
 
-from networkx import DiGraph
-
 # Model class imports
 from AST import AST
+from compact_ast import CompactAST
+from random_stream import RandomStream
+from fitness_index import FitnessIndex
+from method_store import MethodStore
+from running_stats import RunningStats
+from weighted_sampler import WeightedSampler
+from log_writer import LogWriter
+from directory_index import DirectoryIndex
 
 class code_dev_simulation():
     """
     The main model class for simulating a software development process.
 
-    A directed graph is created to keep track of code references, while the java source code
-    is stored internally in an AST
+    The methods and the references between them are kept in an array-backed method store, while
+    the java source code is stored internally in an AST. The reference graph is only built as a
+    networkx graph when it is requested
 
     Args:
         iterations (int): Total amount of iterations to simulate
@@ -33,8 +39,23 @@ class code_dev_simulation():
             1 = Only caller
             2 = Only callee
             3 = No preferential attachment
+        lazy_ast (boolean): Counts-only mode, only keep statement numbers and calls instead of plyj nodes,
+            the plyj tree is reconstructed by java_classes() when the java code is needed
+        seed (int): Seed for the random number stream of the simulation, None for fresh entropy
+        rng (RandomStream): Random number stream to use instead of creating one from seed,
+            e.g. one of the streams spawned for a set of independent simulations
+        recorder (StepRecorder): Streams the state of every step to the output file during the run, None to not stream
+        keep_lists (boolean): Keep the state of every step in the analysis lists (list_fmin, list_action, ...),
+            turn off for long runs that stream their output with a recorder
+        log_writer (LogWriter): Writer for the gource log when logging, None for a default writer of ./vid/code.log
+        rejection_free (boolean): Sample every step from the actions that can currently make a change, with their
+            probabilities renormalized, instead of retrying actions until one makes a change
+        instrumentation (Instrumentation): Keeps the calls and wall times of the phases and actions of every step,
+            None to not time the steps
     """
-    def __init__(self, iterations, fitness_method, probabilities, exp_condition, add_state, logging, pref_attach_condition):
+    def __init__(self, iterations, fitness_method, probabilities, exp_condition, add_state, logging, pref_attach_condition,
+                 lazy_ast=False, seed=None, rng=None, recorder=None, keep_lists=True, log_writer=None, rejection_free=False,
+                 instrumentation=None):
         # params
         self.iterations = iterations
         self.fitness_method = fitness_method
@@ -42,26 +63,53 @@ class code_dev_simulation():
         self.exp_condition = exp_condition
         self.add_state = add_state
         self.pref_attach_condition = pref_attach_condition
+        self.recorder = recorder
+        self.keep_lists = keep_lists
+        self.rejection_free = rejection_free
+        self.instrumentation = instrumentation
 
         # initialisations
+        self.rng = rng if rng is not None else RandomStream(seed)
+        # The gource log draws from its own stream, so logging does not change the simulation
+        self.log_rng = self.rng.spawn(1)[0]
         self.start = time.time()
         self.running = True
         self.logging = logging
+        self.log_writer = None
+        if logging:
+            self.log_writer = log_writer if log_writer is not None else LogWriter('./vid/code.log')
         self.step_n = 0
         self.possible_actions = [self.create_method, self.call_method, self.update_method, self.remove_method]
         self.changes = []
         self.fitness = []
+        # Number of removals per number of methods removed in one cascade of remove_method
+        self.cascade_sizes = Counter()
+        # Number of sampled actions that made no change and were retried, per action name
+        self.rejections = Counter()
 
         # AST modifications
-        self.AST = AST()
+        self.AST = CompactAST() if lazy_ast else AST()
 
         # AST log file
         self.create_dir_prob = 0.5
-        self.directory_map = {}
+        self.directory_map = DirectoryIndex()
+
+        # Create basic AST from .java file and parse to the method store
+        self.store = MethodStore()
+
+        # The fitness index keeps the methods ordered on the fitness in the store for pick_unfit_method and get_fmin
+        # Running statistics keep the fitness index and the total code size up to date for save_states
+        self.fitness_index = FitnessIndex(self.store)
+        self.statistics = RunningStats(self.fitness_index)
+
+        # Preferential attachment weights: body size + 1 for callers, in-degree + 1 for callees
+        self.caller_sampler = WeightedSampler()
+        self.callee_sampler = WeightedSampler()
 
-        # Create basic AST from .java file and parse to a directed reference graph
-        self.reference_graph = DiGraph()
-        self.classes = []
+        # Classes by name in order of creation, and a sampler of the class ids weighted by the number of methods
+        self.classes = {}
+        self.class_ids = {}
+        self.class_sampler = WeightedSampler()
         self.get_tree()
 
         # Analysis lists
@@ -71,6 +119,14 @@ class code_dev_simulation():
         self.list_fit_stats = []
         self.total_code_size = []
 
+    @property
+    def reference_graph(self):
+        """
+        The reference graph of the methods as a networkx DiGraph, built from the method store
+        Nodes are method names with {'data': {'method', 'class', 'fitness', 'lines'}} as data
+        """
+        return self.store.to_graph()
+
     def get_tree(self):
         """
         Parse a .java file and get its declarations, then initialise the references
@@ -78,27 +134,26 @@ class code_dev_simulation():
         with open(path.join(path.dirname(__file__), './', 'app.java')) as j_file:
             parser = Parser()
             tree = parser.parse_file(j_file)
-            initial_classes = tree.type_declarations
+            initial_classes = self.AST.load_classes(tree.type_declarations)
 
         self.initialise_references(initial_classes)
 
     def initialise_references(self, initial_classes):
         """
-        Initialise the reference graph by adding methods in the initial java file as nodes
-        They are initialised with a method name, their class, and a fitness value
+        Initialise the method store by adding the methods in the initial java file
+        They are initialised with their class and a fitness value
         The classes are added to a list
 
         Args:
             initial_classes (list): The initial classes to instantiate the reference graph with
         """
         for java_class in initial_classes:
-            self.classes.append(java_class)
+            class_id = self.add_class(java_class)
             self.directory_map[java_class.name] = ''
-            self.append_log_line('A', '/' + java_class.name, 'w')
-            for java_element in java_class.body:
-                if isinstance(java_element, MethodDeclaration):
-                    self.reference_graph.add_node(java_element.name, data={'method': java_element, 'class': java_class, 'fitness': self.get_fitness(), 'lines': 0})
-                    self.append_log_line('M', '/' + java_class.name)
+            self.append_log_line('A', '/' + java_class.name)
+            for java_method in self.AST.class_methods(java_class):
+                self.add_method(java_method, class_id)
+                self.append_log_line('M', '/' + java_class.name)
 
     def get_fitness(self):
         """
@@ -107,45 +162,172 @@ class code_dev_simulation():
         fitness_method == 0: returns random number between 0 and 1 (uniform distribution)
         """
         if self.fitness_method == 0:
-            return np.random.random()
+            return self.rng.random()
 
-    def run_model(self):
+    def add_method(self, method, class_id):
         """
-        Run function that completely runs the model
+        Add a method of the AST to the method store with a new fitness, and to the fitness index and samplers
+
+        Args:
+            method: The method declaration in the AST
+            class_id (int): Id of the class of the method in the method store
+
+        Returns:
+            Id of the method
         """
-        for _ in range(self.iterations):
-            self.changes.append(self.step())
+        method_id = self.store.add(method, class_id, self.get_fitness(), self.AST.body_size(method))
+        self.class_sampler.set_weight(class_id, self.class_sampler.weight(class_id) + 1)
+        self.statistics.set_fitness(method_id, self.store.fitness[method_id])
+        self.caller_sampler.add(method_id, 0)
+        self.callee_sampler.add(method_id, 0)
+        self.update_weights(method_id)
+        return method_id
+
+    def add_class(self, class_node):
+        """
+        Add a class of the AST to the classes, the method store and the class sampler
+
+        Args:
+            class_node: The class declaration in the AST
+
+        Returns:
+            Id of the class
+        """
+        self.classes[class_node.name] = class_node
+        class_id = self.class_ids[class_node.name] = self.store.add_class(class_node)
+        self.class_sampler.add(class_id, 0)
+        return class_id
+
+    def set_fitness(self, method_id):
+        """
+        Assign a new fitness to a method and update the fitness index and running statistics
+
+        Args:
+            method_id (int): Id of the method
+        """
+        self.statistics.set_fitness(method_id, self.get_fitness())
+
+    def change_lines(self, method_id, lines):
+        """
+        Change the amount of lines of a method and the total code size
+
+        Args:
+            method_id (int): Id of the method
+            lines (int): Number of lines to add, negative to remove lines
+        """
+        self.store.lines[method_id] += lines
+        self.statistics.add_lines(lines)
+
+    def update_weights(self, method_id):
+        """
+        Update the body size and preferential attachment weights of a method after its body or in-degree changed
+
+        Args:
+            method_id (int): Id of the method
+        """
+        body_size = self.AST.body_size(self.store.methods[method_id])
+        self.store.body_size[method_id] = body_size
+        self.caller_sampler.set_weight(method_id, body_size + 1)
+        self.callee_sampler.set_weight(method_id, int(self.store.in_degree[method_id]) + 1)
+
+    def run_model(self, checkpointer=None, profiler=None):
+        """
+        Run function that completely runs the model, or the remaining steps of a model loaded from a checkpoint
+
+        Args:
+            checkpointer (Checkpointer): Writes checkpoints of the model during the run, None for no checkpoints
+            profiler (StepProfiler): Profiles the steps in its window, None to not profile
+        """
+        while self.step_n < self.iterations:
+            if profiler is not None:
+                profiler.step(self.step_n)
+            self.step()
             self.step_n += 1
+            if checkpointer is not None:
+                checkpointer.step(self)
+        if profiler is not None:
+            profiler.disable()
+
+        if self.recorder is not None:
+            self.recorder.flush()
+        if self.log_writer is not None:
+            self.log_writer.close()
 
     def step(self):
         """
         Step function for every iteration
 
-        Uses probabilities dictionary to determine which function to use
-        """
-        action = self.sample(self.possible_actions, self.get_probabilities())
-        delta_change = 0
+        Uses probabilities dictionary to determine which function to use. Actions that make no change
+        are counted in rejections and another action is sampled, unless the model is rejection free,
+        then the action is sampled once with the probabilities of get_feasible_probabilities().
+        When the model has an instrumentation, the phases and actions of the step are timed in it
+        """
+        instrumentation = self.instrumentation
+        start = time.perf_counter() if instrumentation is not None else None
+        if not self.rejection_free:
+            # This action is never run, the draw is kept so seeded runs stay the same
+            self.sample(self.possible_actions, self.get_probabilities())
+
+        while True:
+            if self.rejection_free:
+                action = self.sample(self.possible_actions, self.get_feasible_probabilities())
+            else:
+                action = self.sample(self.possible_actions, self.get_probabilities())
+            if instrumentation is not None:
+                start = instrumentation.time_phase('selection', start)
 
-        while delta_change == 0:
-            action = self.sample(self.possible_actions, self.get_probabilities())
             delta_change = action()
+            if instrumentation is not None:
+                start = instrumentation.time_action(action.__name__, start)
+            if delta_change != 0 or self.rejection_free:
+                break
+            self.rejections[action.__name__] += 1
 
-        self.save_states(action)
+        self.save_states(action, delta_change)
+        if instrumentation is not None:
+            instrumentation.time_phase('recording', start)
 
         return delta_change
 
-    def save_states(self, action):
+    def instrumentation_summary(self):
+        """
+        Summary of the instrumentation: the number of steps, the time per phase, the calls, rejections and
+        time per action and the histogram of the cascade sizes of remove_method
+
+        Returns:
+            Dict with the summary, or None if the model is not instrumented
+        """
+        if self.instrumentation is None:
+            return None
+        summary = self.instrumentation.summary()
+        summary['steps'] = self.step_n
+        for name, action in summary['actions'].items():
+            action['rejections'] = self.rejections[name]
+        summary['rejections'] = sum(self.rejections.values())
+        summary['cascade_sizes'] = dict(sorted(self.cascade_sizes.items()))
+        return summary
+
+    def save_states(self, action, delta_change):
         """
-        Saves the state of the model every step
+        Saves the state of the model every step, using the running statistics
 
         Args:
             action (function): The function that is called this step
+            delta_change (int): The number of changed lines this step
         """
-        self.list_fmin.append(self.get_fmin())
-        self.list_action.append(action.__name__)
-        fitnesses = self.get_fitnesses()
-        self.list_fit_stats.append(self.fitness_stats(fitnesses))
-        self.total_code_size.append(self.get_total_code_size())
+        fmin = self.get_fmin()
+        fit_stats = self.statistics.fitness_stats()
+        code_size = self.statistics.code_size
+
+        if self.recorder is not None:
+            self.recorder.record(self.step_n, fmin, action.__name__, fit_stats, code_size, delta_change)
+
+        if self.keep_lists:
+            self.list_fmin.append(fmin)
+            self.list_action.append(action.__name__)
+            self.list_fit_stats.append(fit_stats)
+            self.total_code_size.append(code_size)
+            self.changes.append(delta_change)
 
     def create_method(self):
         """
@@ -155,7 +337,7 @@ class code_dev_simulation():
         A class is selected, then created using the method in the AST class:
             AST.create_method(class)        returns: the new method
         Its class is added to the classes list.
-        The method is finally added to the reference graph with its class and fitness as properties
+        The method is finally added to the method store with its class and fitness as properties
 
         Returns:
             The number of changes made
@@ -165,18 +347,15 @@ class code_dev_simulation():
               Consistent empty method creation does not make much sense
             - But it also doesn't really matter what's in the method right?
         """
-        if np.random.random() <= self.probabilities['create_class']:
+        if self.rng.random() <= self.probabilities['create_class']:
             selected_class = self.create_class()
             changes = 2
         else:
-            n_methods = self.get_method_amounts()
-            probabilities = list(np.array(n_methods)/np.sum(n_methods))
-            selected_class = self.sample(self.classes, probabilities)
+            # Select a class with a probability proportional to its number of methods
+            selected_class = self.store.class_nodes[self.class_sampler.sample(self.rng.random())]
             changes = 1
         method = self.AST.create_method(selected_class)
-        fitness = self.get_fitness()
-
-        self.reference_graph.add_node(method.name, data={'method': method, 'class': selected_class, 'fitness': fitness, 'lines': 0})
+        self.add_method(method, self.class_ids[selected_class.name])
         self.append_log_line('M', self.directory_map[selected_class.name] + '/' + selected_class.name)
 
 
@@ -187,109 +366,115 @@ class code_dev_simulation():
 
     def call_method(self):
         """
-        Sample two random functions from the reference graph and use them to determine a caller and callee
+        Sample a caller and a callee from the weighted samplers, using their weights (body size + 1
+        and in-degree + 1) or uniform sampling depending on the preferential attachment condition
         Use AST class to create a reference:
             AST.create_reference(
                 caller method, callee method, callee class
             )       returns: the new reference (does not have to be used)
         Set a new fitness for the caller method
-        Then add a new edge from the caller to the callee in the reference graph
+        Then add a new edge from the caller to the callee in the method store
 
         A method does not call itself, and does not call another method twice
 
         Returns:
             The number of changes made
         """
-        methods = []
-        sizes = []
-        in_degrees = []
-        for node, in_degree in self.reference_graph.in_degree():
-            in_degrees.append(in_degree)
-            data = self.reference_graph.node[node]['data']
-            methods.append(data)
-            sizes.append(len(data['method'].body))
-
-        sizes = [1 if s == 0 else s+1 for s in sizes]
-        in_degrees = [1 if s == 0 else s+1 for s in in_degrees]
-        caller_method_probabilities = list(np.array(sizes)/np.sum(sizes))
-        callee_method_probabilities = list(np.array(in_degrees)/np.sum(in_degrees))
-
         # Preferential attachment 2
         if self.pref_attach_condition == 0:
-            caller_info = self.sample(methods, caller_method_probabilities)
-            callee_info = self.sample(methods, callee_method_probabilities)
+            caller = self.sample_caller(True)
+            callee = self.callee_sampler.sample(self.rng.random())
         # Caller pref attachment
         elif self.pref_attach_condition == 1:
-            caller_info = self.sample(methods, caller_method_probabilities)
-            callee_info = np.random.choice(methods)
+            caller = self.sample_caller(True)
+            callee = self.callee_sampler.sample_uniform(self.rng.random())
         # callee pref attachment
         elif self.pref_attach_condition == 2:
-            caller_info = np.random.choice(methods)
-            callee_info = self.sample(methods, callee_method_probabilities)
+            caller = self.sample_caller(False)
+            callee = self.callee_sampler.sample(self.rng.random())
         # No preferential attachment
         elif self.pref_attach_condition == 3:
-            caller_info = np.random.choice(methods)
-            callee_info = np.random.choice(methods)
+            caller = self.sample_caller(False)
+            callee = self.callee_sampler.sample_uniform(self.rng.random())
 
         if self.exp_condition != 'reproduce':
-            callee_info = self.find_callee(caller_info, callee_info, methods, callee_method_probabilities, sizes,
-                                           in_degrees)
-        if callee_info is None:
+            callee = self.find_callee(caller, callee)
+        if callee is None:
             return 0
 
         self.AST.create_reference(
-            caller_info['method'], callee_info['method'], callee_info['class']
+            self.store.methods[caller], self.store.methods[callee], self.store.class_of(callee)
         )
 
-        caller_info['fitness'] = self.get_fitness()
-        caller_info['lines'] += 1
-        self.reference_graph.add_edge(caller_info['method'].name, callee_info['method'].name)
-        self.append_log_line('M', self.directory_map[caller_info['class'].name] + '/' + caller_info['class'].name)
+        self.set_fitness(caller)
+        self.change_lines(caller, 1)
+        self.store.add_edge(caller, callee)
+        self.update_weights(caller)
+        self.update_weights(callee)
+        caller_class = self.store.class_of(caller)
+        self.append_log_line('M', self.directory_map[caller_class.name] + '/' + caller_class.name)
         return 1
 
-    def call_exists(self, callee_method, caller_method):
+    def sample_caller(self, preferential):
+        """
+        Sample a caller for call_method, proportional to its weight (body size + 1) or uniformly
+
+        A rejection free model leaves out the callers that already call every other method, unless
+        methods can call themselves and call a method twice (the reproduce condition)
+
+        Args:
+            preferential (bool): Sample proportional to the weights instead of uniformly
+
+        Returns:
+            Id of the caller method
+        """
+        u = self.rng.random()
+        saturated = None
+        if self.rejection_free and self.exp_condition != 'reproduce':
+            saturated = self.store.saturated_callers()
+        if saturated:
+            if preferential:
+                return self.caller_sampler.sample_excluding(u, saturated)
+            return self.caller_sampler.sample_uniform_excluding(u, saturated)
+        if preferential:
+            return self.caller_sampler.sample(u)
+        return self.caller_sampler.sample_uniform(u)
+
+    def call_exists(self, callee, caller):
         """
-        Checks whether a call to callee is already being made in the caller
+        Checks whether a call to callee is already being made in the caller, using the call index of the AST
 
         Returns: (bool) True if a call is already being made
         """
-        callee_class = callee_method['class']
-        callee_method = callee_method['method']
-        caller_method = caller_method['method']
-        for stmt in caller_method.body:
-            if isinstance(stmt, ExpressionStatement) and\
-                        isinstance(stmt.expression, MethodInvocation) and\
-                        stmt.expression.name == callee_method.name and\
-                        stmt.expression.target.value == callee_class.name:
-                return True
-        return False
+        return self.AST.has_reference(self.store.methods[caller], self.store.methods[callee], self.store.class_of(callee))
 
-    def find_callee(self, caller_info, callee_info, methods, callee_method_probabilities, sizes, in_degrees):
+    def find_callee(self, caller, callee):
         """
         Find a method to call that is not equal to the caller and has not been called by the caller already
 
+        If the sampled callee is not valid, a callee is drawn based on the in-degrees of all methods,
+        leaving out the caller and the methods it already calls
+
         Args:
-            caller_info: caller function node
-            callee_info: callee function node
-            methods (list): list of all the available methods to call
-            callee_method_probabilities (list<float>): Probabilities for every function to be called
-            sizes (list<int>): List of all sizes of methods
-            in_degrees (list<int>): List of all the references a method has
+            caller (int): Id of the caller method
+            callee (int): Id of the sampled callee method
 
         Returns:
-            Callee method or None if no methods available
+            Id of the callee method or None if no methods available
         """
-        while caller_info['method'].name == callee_info['method'].name or self.call_exists(callee_info,caller_info):
+        if callee != caller and not self.call_exists(callee, caller):
+            return callee
+
+        # The caller already calls every other method
+        calls_itself = self.store.has_edge(caller, caller)
+        n_excluded = int(self.store.out_degree[caller]) + (0 if calls_itself else 1)
+        if n_excluded >= len(self.callee_sampler):
+            return None
 
-            callee_info = self.sample(methods, callee_method_probabilities)
-            callee_method_probabilities.pop(methods.index(callee_info))
-            sizes.pop(methods.index(callee_info))
-            in_degrees.pop(methods.index(callee_info))
-            callee_method_probabilities = list(np.array(in_degrees)/np.sum(in_degrees))
-            methods.remove(callee_info)
-            if len(methods) == 0:
-                return None
-        return callee_info
+        excluded = list(self.store.callees[caller])
+        if not calls_itself:
+            excluded.append(caller)
+        return self.callee_sampler.sample_excluding(self.rng.random(), excluded)
 
     def update_method(self):
         """
@@ -310,21 +495,25 @@ class code_dev_simulation():
             - Think the chance to add a statement should be higher, since repos
             - grow?
         """
-        node = self.pick_unfit_method()
-        method = node['data']['method']
+        method_id = self.pick_unfit_method()
+        method = self.store.methods[method_id]
         change = 0
-        if np.random.random() <= self.add_state:
+        # A rejection free model only updates a method without declarations to add a statement
+        if (self.rejection_free and not self.AST.declarations(method)) or self.rng.random() <= self.add_state:
             self.AST.add_statement(method)
-            self.reference_graph.node[node['data']['method'].name]['data']['lines'] += 1
+            self.change_lines(method_id, 1)
+            self.update_weights(method_id)
             change = 1
         else:
             stmt = self.pick_statement(method)
-            if stmt:
+            if stmt is not None:
                 self.AST.delete_statement(method, stmt)
-                self.reference_graph.node[node['data']['method'].name]['data']['lines'] -= 1 if self.reference_graph.node[node['data']['method'].name]['data']['lines'] > 0 else 0
+                self.change_lines(method_id, -1 if self.store.lines[method_id] > 0 else 0)
+                self.update_weights(method_id)
                 change = -1
-        self.append_log_line('M', self.directory_map[node['data']['class'].name] + '/' + node['data']['class'].name)
-        self.reference_graph.node[node['data']['method'].name]['data']['fitness'] = self.get_fitness()
+        class_node = self.store.class_of(method_id)
+        self.append_log_line('M', self.directory_map[class_node.name] + '/' + class_node.name)
+        self.set_fitness(method_id)
         return change
 
     def pick_statement(self, method):
@@ -339,71 +528,115 @@ class code_dev_simulation():
         Returns:
             Statement or None if method no statements
         """
-        declarations = []
-        for java_element in method.body:
-                if isinstance(java_element, VariableDeclaration):
-                    declarations.append(java_element)
+        declarations = self.AST.declarations(method)
         if len(declarations) > 0:
-            return np.random.choice(declarations)
+            return declarations[self.rng.randint(len(declarations))]
         else:
             return None
 
-    def remove_method(self, node=None):
+    def remove_method(self, method_id=None):
         """
         Deletes a method and deletes the method call from its callers.
         If a caller becomes empty after deleting the method, delete the caller as well and the deletion propagates
 
-        References graph can be used to determine the references and they can be deleted using the AST class:
+        The deletion cascade is processed with a stack of the methods to delete, in the same (depth first)
+        order as a recursive deletion of the callers that became empty would. The size of every cascade
+        is counted in cascade_sizes
+
+        Args:
+            method_id (int): Id of the method to be deleted. If None, choose one using pick_unfit_method
+        Returns:
+            The number of changes made
+        """
+        if len(self.store) == 1:
+            return 0
+        if method_id is None:
+            method_id = self.pick_unfit_method()
+
+        change_size = 0
+        cascade_size = 0
+        stack = [method_id]
+        while stack:
+            method_id = stack.pop()
+            if len(self.store) == 1:
+                continue
+            void_callers, changes = self.remove_single_method(method_id)
+            change_size += changes
+            cascade_size += 1
+
+            # The first caller that became empty is deleted first
+            stack.extend(reversed(void_callers))
+
+        self.cascade_sizes[cascade_size] += 1
+        return change_size
+
+    def remove_single_method(self, method_id):
+        """
+        Deletes one method and the method calls to it from its callers
+
+        The method store can be used to determine the references and they can be deleted using the AST class:
             AST.delete_reference(caller node, method, class node)
         After deleting all callers, the method can be deleted using:
             AST.delete_method(class node, method)
-        Remove the method node from the reference graph
+        Remove the method from the method store
 
         Args:
-            node: The method node to be deleted. If None, choose one using pick_unfit_method
+            method_id (int): Id of the method to be deleted
         Returns:
-            The number of changes made
+            (list of the ids of the callers that have become empty, the number of changes made)
         """
         change_size = 0
-        if len(self.reference_graph.nodes()) == 1:
-            return 0
-        if node is None:
-            node = self.pick_unfit_method()
-
-        method_info = node
-        class_node = node['data']['class']
-        method = node['data']['method'].name
+        method = self.store.methods[method_id]
+        class_id = self.store.class_id[method_id]
+        class_node = self.store.class_nodes[class_id]
 
         void_callers = []
-        for caller in self.reference_graph.predecessors(method):
-            if caller != method:
+        for caller in self.store.callers[method_id]:
+            if caller != method_id:
                 # Get the caller and delete the reference
-                caller_info = self.reference_graph.node[caller]['data']
-                caller_node = caller_info['method']
-                self.AST.delete_reference(caller_node, method_info['data']['method'], class_node)
-                self.append_log_line('M', self.directory_map[method_info['data']['class'].name] + '/' + method_info['data']['class'].name)
+                caller_node = self.store.methods[caller]
+                self.AST.delete_reference(caller_node, method, class_node)
+                self.update_weights(caller)
+                self.append_log_line('M', self.directory_map[class_node.name] + '/' + class_node.name)
                 # If the caller has become empty, add it to the queue to delete later
-                if len(caller_node.body) == 0:
+                if self.AST.body_size(caller_node) == 0:
                     void_callers.append(caller)
                 else:
                     # Otherwise change its fitness
-                    caller_info['fitness'] = self.get_fitness()
-                    caller_info['lines'] -= 1
+                    self.set_fitness(caller)
+                    self.change_lines(caller, -1)
                     change_size -= 1
         # Delete the method after deleting all the invocation statements
-        self.AST.delete_method(class_node, method_info['data']['method'])
-        self.append_log_line('M', self.directory_map[method_info['data']['class'].name] + '/' + method_info['data']['class'].name)
-        self.reference_graph.remove_node(method)
+        self.AST.delete_method(class_node, method)
+        self.append_log_line('M', self.directory_map[class_node.name] + '/' + class_node.name)
+        callees = [callee for callee in self.store.callees[method_id] if callee != method_id]
+        self.statistics.remove(method_id, int(self.store.lines[method_id]))
+        self.caller_sampler.remove(method_id)
+        self.callee_sampler.remove(method_id)
+        self.store.remove(method_id)
+        self.class_sampler.set_weight(class_id, self.class_sampler.weight(class_id) - 1)
+        for callee in callees:
+            self.update_weights(callee)
         if len(class_node.body) == 0:
-            self.classes.remove(class_node)
+            del self.classes[class_node.name]
+            self.class_sampler.remove(class_id)
+            self.store.remove_class(class_id)
+            del self.class_ids[class_node.name]
             self.append_log_line('D', self.directory_map[class_node.name] + '/' + class_node.name)
             del self.directory_map[class_node.name]
         change_size -= 1
 
-        # Then recursively do the same for all the methods that have become empty in the process
-        for caller in void_callers:
-            change_size += self.remove_method(self.get_node_data(caller))
-        return change_size
+        return void_callers, change_size
+
+    def cascade_stats(self):
+        """
+        Returns a list of the number of removals and the mean and max number of methods removed in one removal
+        """
+        count = sum(self.cascade_sizes.values())
+        if count == 0:
+            return [0, 0.0, 0]
+        mean = sum(size * number for size, number in self.cascade_sizes.items()) / count
+        return [count, mean, max(self.cascade_sizes)]
 
     def create_class(self):
         """
@@ -414,7 +647,7 @@ class code_dev_simulation():
             Created class
         """
         class_node = self.AST.create_class()
-        self.classes.append(class_node)
+        self.add_class(class_node)
         self.directory_map[class_node.name] = self.get_dir()
         self.append_log_line('A', self.directory_map[class_node.name] + '/' + class_node.name)
         return class_node
@@ -423,50 +656,22 @@ class code_dev_simulation():
         """
         Picks a method based on its (low) fitness
 
-        Currently selects the method with lowest fitness
+        Currently selects the method with lowest fitness, which is kept on top of the fitness index
 
         Returns:
-            method
+            Id of the method
         """
-        method_fitness = ('empty', 2)
-        nodes_dict = dict(self.reference_graph.nodes(data=True))
-        for method_node in self.reference_graph.__iter__():
-            node_data = nodes_dict[method_node]
-            fitness = node_data['data']['fitness']
-
-            if fitness < method_fitness[1]:
-                method_fitness = (node_data, fitness)
-
-        return method_fitness[0]
+        method_id, _ = self.fitness_index.top()
+        return method_id
 
     def get_fmin(self):
         """
-        copy of pick_unfit_method
         Currently selects the method with lowest fitness
 
         returns fmin
         """
-        method_fitness = ('empty', 2)
-        nodes_dict = dict(self.reference_graph.nodes(data=True))
-        for method_node in self.reference_graph.__iter__():
-            node_data = nodes_dict[method_node]['data']
-            fitness = node_data['fitness']
-            if fitness < method_fitness[1]:
-                method_fitness = (node_data, fitness)
-        return method_fitness[1]
-
-    def get_node_data(self, node):
-        """
-        Return node data from the reference graph
-
-        Args:
-            node (string): The name of the node to return the data of
-
-        Returns:
-            Data of the node defined in the reference graph
-        """
-        nodes_dict = dict(self.reference_graph.nodes(data=True))
-        return nodes_dict[node]
+        _, fmin = self.fitness_index.top()
+        return fmin
 
     def sample(self, elements, probalities):
         """
@@ -479,7 +684,7 @@ class code_dev_simulation():
         Returns:
             Sampled element from elements
         """
-        return np.random.choice(elements, p=probalities)
+        return self.rng.choice(elements, p=probalities)
 
     def get_method_amounts(self):
         """
@@ -487,14 +692,16 @@ class code_dev_simulation():
 
         Returns (list<int>) List of amount of methods in same order as self.classes
         """
-        class_n_methods = []
-        for java_class in self.classes:
-            n_methods = 0
-            for java_element in java_class.body:
-                if isinstance(java_element, MethodDeclaration):
-                    n_methods += 1
-            class_n_methods.append(n_methods)
-        return class_n_methods
+        return [self.class_sampler.weight(self.class_ids[name]) for name in self.classes]
+
+    def java_classes(self):
+        """
+        Get the classes of the simulation as plyj class declarations, e.g. to print the java code
+
+        Returns:
+            List of class declarations
+        """
+        return self.AST.materialize(list(self.classes.values()))
 
     def get_probabilities(self):
         """
@@ -511,55 +718,88 @@ class code_dev_simulation():
             self.probabilities['delete_method']
         ]
 
-    def get_fitnesses(self):
+    def get_feasible_probabilities(self):
         """
-        copy of pick_unfit_method
-        Currently selects the method with lowest fitness
+        Get the probabilities of get_probabilities(), times the probability that the action makes a change:
+            call_method: a caller is drawn that does not call every other method yet (always in reproduce)
+            update_method: the unfit method has a declaration to delete, or a statement is added (add_state)
+            remove_method: there is more than one method
+        The sampled action always makes a change, choice() renormalizes the probabilities
+
+        Returns:
+            List<float> probabilities of four method manipulation functions
+        """
+        create, call, update, delete = self.get_probabilities()
+
+        saturated = self.store.saturated_callers() if self.exp_condition != 'reproduce' else None
+        if saturated:
+            if self.pref_attach_condition in (0, 1):
+                call *= 1 - sum(self.caller_sampler.weight(caller) for caller in saturated) / self.caller_sampler.total
+            else:
+                call *= 1 - len(saturated) / len(self.caller_sampler)
+        if not self.AST.declarations(self.store.methods[self.pick_unfit_method()]):
+            update *= self.add_state
+        if len(self.store) == 1:
+            delete = 0
+
+        if create + call + update + delete <= 0:
+            raise ValueError('None of the actions can make a change with the current probabilities')
+        return [create, call, update, delete]
 
+    def get_fitnesses(self):
+        """
         Returns:
             list of fitnesses
 
         """
-        nodes_dict = dict(self.reference_graph.nodes(data=True))
-        return [nodes_dict[method_node]['data']['fitness'] for method_node in self.reference_graph.__iter__()]
+        return list(self.store.fitness[self.store.alive])
 
-    def fitness_stats(self, fitnesses):
+    def fitness_stats(self):
         """
-        Gets list of fitnesses of the methods as input
-        Returns a list of mean, std, min, max values
+        Exact statistics of the fitnesses, computed from the method store
+        Returns a list of count, mean, std, min, max values
         """
-        fitnesses = np.array(fitnesses)
-        return [len(fitnesses), fitnesses.mean(), fitnesses.std(), fitnesses.min(), fitnesses.max()]
+        return self.store.fitness_stats()
 
     def get_total_code_size(self):
         """
-        Save the total code base size (total amount of method lines) by summing the lines of each method
+        Get the total code base size (total amount of method lines) by summing the lines of each method
         """
-        nodes_dict = dict(self.reference_graph.nodes(data=True))
-        return sum([nodes_dict[method_node]['data']['lines'] for method_node in self.reference_graph.__iter__()])
+        return self.store.total_lines()
 
     def get_dir(self):
+        """
+        Pick a directory for a new class in the gource log: a new directory, the directory of one of
+        the classes, or a new directory nested in the directory of one of the classes (other than '')
+
+        The nesting is done in a loop, drawing the random numbers in the same order as the recursion did
+
+        Returns:
+            The directory
+        """
         if self.logging == False:
             return ''
 
-        if np.random.random() <= self.create_dir_prob:
-            num = len(self.directory_map.values())
-            if np.random.random() <= 0.6:
-                nlp = list(self.directory_map.values()).copy()
-                if '' in nlp:
-                    nlp.remove('')
-                if len(nlp) == 0:
-                    nlp.append('/dir_' + str(int(np.random.random() * 10000)))
-                return np.random.choice(nlp) + self.get_dir()
-            return '/dir_' + str(num)
-        else:
-            return np.random.choice(list(self.directory_map.values()))
+        prefix = ''
+        while self.log_rng.random() <= self.create_dir_prob:
+            if self.log_rng.random() > 0.6:
+                return prefix + '/dir_' + str(len(self.directory_map))
+
+            # Nest in the directory of a class that is not in the root directory, or in a new one if there is none
+            u = self.log_rng.random()
+            directory = self.directory_map.sample_excluding_empty(u)
+            if directory is None:
+                directory = '/dir_' + str(int(u * 10000))
+                # The new directory used to be chosen from a list of one, which draws a number
+                self.log_rng.random()
+            prefix += directory
+
+        return prefix + self.directory_map.sample(self.log_rng.random())
 
-    def append_log_line(self, action, fl, param='a+'):
+    def append_log_line(self, action, fl):
         if self.logging == False:
             return
         time = self.start + self.step_n * 100
-        user = 'user_' + str(np.random.randint(1, 10))
+        user = 'user_' + str(self.log_rng.randint(1, 10))
 
-        f = open("./vid/code.log", param)
-        f.write(str(int(time)) + '|' + user + '|' + action + '|' + fl + '\n')
+        self.log_writer.write(str(int(time)) + '|' + user + '|' + action + '|' + fl + '\n')
@@ -0,0 +1,139 @@
+import cProfile
+import inspect
+import json
+import pstats
+import re
+
+
+class StepProfiler:
+    """
+    Profiles a window of steps of a simulation with cProfile, used by run_model()
+
+    The steps before the window (warm-up) and after it run without profiling. The profile can be
+    written as a .pstats file and as a speedscope (https://www.speedscope.app) flame graph.
+
+    Args:
+        start (int): First step to profile
+        stop (int): Step after the last step to profile
+    """
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = stop
+        self.profile = cProfile.Profile()
+        self.steps = 0
+        self.enabled = False
+
+    def step(self, step_n):
+        """
+        Start or stop profiling before a step, depending on whether it is in the window
+
+        Args:
+            step_n (int): Number of the step that is about to run
+        """
+        if self.start <= step_n < self.stop:
+            if not self.enabled:
+                self.profile.enable()
+                self.enabled = True
+            self.steps += 1
+        elif self.enabled:
+            self.disable()
+
+    def disable(self):
+        """
+        Stop profiling, if it is enabled
+        """
+        if self.enabled:
+            self.profile.disable()
+            self.enabled = False
+
+    def speedscope(self, name, min_seconds=1e-6):
+        """
+        Get the profile in the speedscope file format, as a flame graph of call stacks
+
+        cProfile only keeps the time of every function per caller, so the stacks are estimated: the time
+        a function spent for one caller is split over its own callees and itself in proportion to its total
+        time (like flameprof does). Recursive calls are counted as time of the outer call.
+
+        Args:
+            name (string): Name of the profile
+            min_seconds (float): Stacks that took less time are left out
+
+        Returns:
+            Dict that can be written as a speedscope JSON file
+        """
+        stats = pstats.Stats(self.profile).stats
+        callees = {}
+        for function, (_, _, _, _, callers) in stats.items():
+            for caller, (_, _, _, cumulative) in callers.items():
+                callees.setdefault(caller, []).append((function, cumulative))
+
+        frames = []
+        frame_indices = {}
+        samples = []
+        weights = []
+
+        # Walk the call graph from the functions without callers, with a stack of (function, seconds, path)
+        stack = [(function, data[3], ()) for function, data in stats.items() if not data[4]]
+        while stack:
+            function, seconds, path = stack.pop()
+            if function not in frame_indices:
+                frame_indices[function] = len(frames)
+                frames.append({'name': function[2], 'file': function[0], 'line': function[1]})
+            path = path + (frame_indices[function],)
+
+            if frame_indices[function] in path[:-1]:
+                # Recursive call, all its time is own time
+                own = seconds
+            else:
+                total_time, cumulative = stats[function][2], stats[function][3]
+                scale = seconds / cumulative if cumulative > 0 else 0
+                own = total_time * scale
+                for callee, callee_seconds in callees.get(function, []):
+                    if callee_seconds * scale >= min_seconds:
+                        stack.append((callee, callee_seconds * scale, path))
+            if own >= min_seconds:
+                samples.append(list(path))
+                weights.append(own)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled', 'name': name, 'unit': 'seconds',
+                'startValue': 0, 'endValue': sum(weights),
+                'samples': samples, 'weights': weights
+            }]
+        }
+
+    def write(self, basename):
+        """
+        Write the profile to <basename>.pstats and the flame graph to <basename>.speedscope.json
+
+        Args:
+            basename (string): Name of the files without extension
+
+        Returns:
+            (bool) False if no steps were profiled and nothing is written
+        """
+        self.disable()
+        if self.steps == 0:
+            return False
+        self.profile.dump_stats(basename + '.pstats')
+        with open(basename + '.speedscope.json', 'w') as speedscope_file:
+            json.dump(self.speedscope('steps {} to {}'.format(self.start, self.stop)), speedscope_file)
+        return True
+
+    def print_hot_functions(self, source, count=15):
+        """
+        Print the functions with the most cumulative time during the window
+
+        Args:
+            source: Class (or module) to print the functions of the source file of, e.g. code_dev_simulation
+            count (int): Number of functions to print
+        """
+        if self.steps == 0:
+            return
+        filename = inspect.getsourcefile(source)
+        print('Profiled {} steps, hottest functions in {}:'.format(self.steps, filename))
+        pstats.Stats(self.profile).sort_stats('cumulative').print_stats(re.escape(filename), count)
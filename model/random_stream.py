@@ -0,0 +1,82 @@
+import numpy as np
+
+
+class RandomStream:
+    """
+    Seedable random number stream for the simulation, built on numpy.random.Generator
+
+    Uniform numbers are drawn in blocks of block_size and served one by one from a buffer, so a
+    single draw does not pay the overhead of a call into NumPy. Integers and choices are derived
+    from these uniforms. Independent streams (e.g. one per simulation) are created with spawn().
+
+    Args:
+        seed (int): Seed of the stream, None for fresh entropy
+        block_size (int): Number of uniforms to draw at once
+        seed_sequence (numpy.random.SeedSequence): Seed sequence to use instead of seed
+    """
+    def __init__(self, seed=None, block_size=4096, seed_sequence=None):
+        self.seed_sequence = seed_sequence if seed_sequence is not None else np.random.SeedSequence(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+        self.block_size = block_size
+        self.buffer = []
+        self.position = 0
+
+    @property
+    def seed(self):
+        """
+        The entropy of the (root) seed sequence; passed as seed it reproduces the root stream,
+        and spawning from it again reproduces the child streams in the same order
+        """
+        return self.seed_sequence.entropy
+
+    def spawn(self, n):
+        """
+        Create statistically independent child streams
+
+        Args:
+            n (int): Number of streams
+
+        Returns:
+            List of RandomStream
+        """
+        return [RandomStream(block_size=self.block_size, seed_sequence=child) for child in self.seed_sequence.spawn(n)]
+
+    def random(self):
+        """
+        Returns:
+            Uniform random number in [0, 1)
+        """
+        if self.position == len(self.buffer):
+            self.buffer = self.generator.random(self.block_size).tolist()
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def randint(self, low, high=None):
+        """
+        Random integer in [low, high), or in [0, low) if high is not given (like numpy.random.randint)
+
+        Returns:
+            Random integer
+        """
+        if high is None:
+            low, high = 0, low
+        return low + int(self.random() * (high - low))
+
+    def choice(self, elements, p=None):
+        """
+        Choose one of the elements, uniformly or with the probabilities in p (same order)
+
+        Args:
+            elements (list<any>): Elements to choose from
+            p (list<float>): Probabilities of the elements, None for a uniform choice
+
+        Returns:
+            The chosen element
+        """
+        if p is None:
+            return elements[self.randint(len(elements))]
+        cumulative = np.cumsum(p)
+        index = int(np.searchsorted(cumulative, self.random() * cumulative[-1], side='right'))
+        return elements[min(index, len(elements) - 1)]
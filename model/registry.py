@@ -0,0 +1,164 @@
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_FILE = os.path.join(MODEL_DIR, 'results', 'registry.sqlite')
+
+# Sources that determine the output of a run: the model with its engine modules, the initial code it parses,
+# and the writers of the output file. The settings in run.py and sweep.py are part of the parameters of a run
+SIMULATION_SOURCES = ['model.py', 'AST.py', 'compact_ast.py', 'method_store.py', 'fitness_index.py', 'running_stats.py',
+                      'weighted_sampler.py', 'random_stream.py', 'directory_index.py', 'log_writer.py', 'app.java',
+                      'step_recorder.py', 'trace_file.py']
+
+
+class Registry:
+    """
+    Registry of the runs of the model in a local SQLite database
+
+    Every run is recorded with its full parameters, seed, code version, run time and output file, keyed by
+    its parameters and seed. A run with the same parameters, seed and version of the model code gives the same
+    output, so lookup() returns the recorded run instead of simulating it again. Analysis code can find the
+    output files of runs by their parameters with runs().
+
+    Args:
+        filename (string): Name of the SQLite database, created if it does not exist
+    """
+    def __init__(self, filename=REGISTRY_FILE):
+        self.filename = filename
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with self.connect() as connection:
+            connection.execute('''CREATE TABLE IF NOT EXISTS runs (
+                                      key TEXT PRIMARY KEY,
+                                      params TEXT NOT NULL,
+                                      seed TEXT NOT NULL,
+                                      code_version TEXT NOT NULL,
+                                      git_commit TEXT,
+                                      finished TEXT NOT NULL,
+                                      run_seconds REAL,
+                                      output TEXT NOT NULL)''')
+
+    def connect(self):
+        """
+        Returns a new connection to the database, every operation uses its own connection so a registry
+        can be shared with worker processes
+        """
+        connection = sqlite3.connect(self.filename, timeout=60)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def record(self, params, seed, output, run_seconds=None):
+        """
+        Record a completed run, replacing a previous run with the same parameters, seed and code version
+
+        Args:
+            params (dict): Parameters of the run, should be serializable to json
+            seed (int): Seed of the run
+            output (string): Output file of the run
+            run_seconds (float): Run time of the run
+        """
+        version = code_version()
+        with self.connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (
+                run_key(params, seed, version), json.dumps(params, sort_keys=True), str(seed), version, git_commit(),
+                datetime.datetime.now().isoformat(), run_seconds, os.path.abspath(output)))
+        connection.close()
+
+    def lookup(self, params, seed):
+        """
+        Find the run with the same parameters and seed, made with the current version of the model code
+
+        Returns:
+            The run as a dict (see runs()), or None if there is no such run or its output file no longer exists
+        """
+        with self.connect() as connection:
+            row = connection.execute('SELECT * FROM runs WHERE key = ?',
+                                     (run_key(params, seed, code_version()),)).fetchone()
+        connection.close()
+        if row is None or not os.path.exists(row['output']):
+            return None
+        return run_dict(row)
+
+    def runs(self, **params):
+        """
+        Find the recorded runs by their parameters, e.g. runs(exp_condition='reproduce', pref_attach_condition=2)
+        The probabilities can be given as parameters as well, e.g. runs(call_method=0.4), and the seed as seed
+
+        Returns:
+            List of dicts with the params, seed, code_version, git_commit, finished, run_seconds and output
+            of the matching runs, in the order they were recorded
+        """
+        with self.connect() as connection:
+            rows = connection.execute('SELECT * FROM runs ORDER BY rowid').fetchall()
+        connection.close()
+        wanted = canonical(params)
+        return [run for run in map(run_dict, rows)
+                if all(key in flat_params(run) and canonical(flat_params(run)[key]) == value for key, value in wanted.items())]
+
+
+def run_dict(row):
+    """
+    Returns a row of the runs table as a dict, with the parameters parsed
+    """
+    run = dict(row)
+    del run['key']
+    run['params'] = json.loads(run['params'])
+    run['seed'] = int(run['seed'])
+    return run
+
+
+def flat_params(run):
+    """
+    Returns the parameters of a run with the probabilities and seed as parameters
+    """
+    params = dict(run['params'], seed=run['seed'])
+    params.update(params.pop('probabilities', {}))
+    return params
+
+
+def canonical(value):
+    """
+    Returns a value with the floats that are whole numbers as ints, so e.g. pref attach condition 2.0 equals 2
+    """
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def run_key(params, seed, version):
+    """
+    Returns the key of a run, a hash of its parameters, seed and the code version
+    """
+    text = json.dumps({'params': canonical(params), 'seed': str(seed), 'code_version': version}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def code_version():
+    """
+    Version of the model code: a hash of the SIMULATION_SOURCES, so a change of the simulation invalidates
+    the recorded runs for lookup(), while changing the settings of run.py or an analysis script does not
+    """
+    digest = hashlib.sha1()
+    for name in SIMULATION_SOURCES:
+        digest.update(name.encode())
+        with open(os.path.join(MODEL_DIR, name), 'rb') as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()[:16]
+
+
+def git_commit():
+    """
+    Returns the hash of the checked out git commit, or None if it is not known
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=MODEL_DIR,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
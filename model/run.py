@@ -6,25 +6,53 @@ import pandas as pd
 import time
 import sys
 import os
+from multiprocessing import Pool
 
 # Custom imports
 # Model code from https://github.com/linzhp/Codevo3/releases/tag/MSR2015
 from model import code_dev_simulation
+from random_stream import RandomStream
 from java_printer import JavaPrinter
+from step_recorder import StepRecorder
+from trace_file import TraceWriter, create_trace, append_trace, trace_position, truncate_trace
+from step_recorder import file_position, truncate_file
+from log_writer import LogWriter
+from checkpoint import Checkpointer, load_checkpoint, write_checkpoint, read_checkpoint
+from instrumentation import Instrumentation, write_summary
+from profiling import StepProfiler
+from registry import Registry
 import csv
 import datetime
+import shutil
 
 from visualize_graph import visualize_graph
 from create_commit_plot import convert
 
 DEFAULT_SIMULATIONS = 1
-DEFAULT_ITERATIONS = 10000 # 100,000 steps is around 15 mins
+DEFAULT_SEED = None # Seed of the root random stream, None for fresh entropy (the seed used is printed)
+DEFAULT_ITERATIONS = 10000 # 100,000 steps take around 12 seconds without logging, see benchmarks/benchmark.py
+DEFAULT_WORKERS = 1 # Number of worker processes, more than 1 runs the simulations in parallel
 
 # fitness method = 0 -> uniform distribution
 FITNESS_METHOD = 0
 LOGGING = True # Creates a fake log for gource
+LOG_FILE = './vid/code.log' # File of the gource log, a name ending with .gz writes a gzip compressed log
+LOG_FLUSH_LINES = 1000 # Number of log lines that are buffered before they are written
+LOG_BACKGROUND = False # Write the gource log from a background thread
 GRAPH = True # Create a network graph
 EXP_CONDITION = 'delete_state' # reproduce (recursion/multiple calls possible), 'no_rec', 'delete_state' ...
+LAZY_AST = False # Counts-only mode, the java code is only built when it is written to files
+REJECTION_FREE = False # Sample every step from the actions that can make a change, instead of retrying actions that make none
+INSTRUMENTATION = False # Time the phases and actions of every step, the summary is written next to the output file
+PROFILE_STEPS = None # (start, stop) window of steps to profile with cProfile, e.g. (1000, 2000) to skip 1000 warm-up steps,
+                     # the .pstats and speedscope .json files are written next to the output file. None to not profile
+CHUNK_SIZE = 10000 # Number of step rows that are buffered before they are written to the output file
+OUTPUT_FORMAT = 'csv' # 'csv', or 'npz' for a compact columnar trace file with the run parameters as metadata
+CHECKPOINT_STEPS = 10000 # Write a checkpoint of a running simulation every number of steps, None for no checkpoints on steps
+CHECKPOINT_SECONDS = 600 # Write a checkpoint of a running simulation every number of seconds, None for no checkpoints on time
+RESUME = None # Output file of an interrupted run, to resume the run from its checkpoints
+KEEP_LISTS = False # Also keep the output of every step in memory, in the analysis lists of the model (e.g. for webFigures)
+REGISTRY = True # Record every run in the experiment registry (results/registry.sqlite), and reuse the output of an identical run
 CREATE_COMMITS_CSV = True
 
  # 0 = caller and callee use pref attachment, 1 = only caller, 2 = only callee, 3 = no preferential attachment
@@ -46,7 +74,16 @@ def run_repo_model():
     Argument 1 (int): Amount of iterations to run model
     Argument 2 (bool): Whether to generate the java files created during the simulation
     Argument 3 (int): Amount of simulations of the model to run
+    Argument 4-8 (float): Probabilities of create_class, create_method, call_method, update_method and delete_method
+    Argument 9 (int): Preferential attachment condition
+    Argument 10 (int): Seed of the random streams, every simulation gets its own independent stream
+    Argument 11 (int): Number of worker processes to run the simulations in parallel
+    Argument 12 (string): Output file of an interrupted run, the run is resumed from its checkpoints
+        with the parameters it was started with, the other arguments are ignored
+
+    When a run with the same parameters and seed is in the registry, its output file is printed and nothing is run
     """
+    run_start = time.time()
 
     iterations = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS
     simulations = int(sys.argv[3]) if len(sys.argv) > 1 else DEFAULT_SIMULATIONS
@@ -58,6 +95,21 @@ def run_repo_model():
     PROBABILITIES['delete_method'] = float(sys.argv[8]) if len(sys.argv) > 8 else PROBABILITIES['delete_method']
 
     pref_attach_condition = float(sys.argv[9]) if len(sys.argv) > 9 else DEFAULT_PREF_ATTACH_CONDITION
+    seed = int(sys.argv[10]) if len(sys.argv) > 10 else DEFAULT_SEED
+    workers = int(sys.argv[11]) if len(sys.argv) > 11 else DEFAULT_WORKERS
+    resume = sys.argv[12] if len(sys.argv) > 12 else RESUME
+
+    # Continue an interrupted run with the parameters it was started with
+    if resume:
+        run_state = read_checkpoint(run_checkpoint_filename(resume))
+        params = run_state['params']
+        assert (params['exp_condition'], params['fitness_method'], params['lazy_ast'], params.get('rejection_free', False)) == \
+            (EXP_CONDITION, FITNESS_METHOD, LAZY_AST, REJECTION_FREE), \
+            'EXP_CONDITION, FITNESS_METHOD, LAZY_AST and REJECTION_FREE should be the same as in the interrupted run'
+        iterations, simulations, pref_attach_condition = params['iterations'], params['simulations'], params['pref_attach_condition']
+        seed, workers = params['seed'], params['workers']
+        PROBABILITIES.update(params['probabilities'])
+        print('Resuming {} after {} completed simulations'.format(resume, run_state['sims_done']))
 
     assert (EXP_CONDITION in ['reproduce', 'no_rec', 'delete_state'])
 
@@ -70,38 +122,159 @@ def run_repo_model():
         add_prob = ADD_STATE
     else:
         add_prob = 1
+    if resume:
+        add_prob = params['add_prob']
     print('Statements are added with prob: {} and deleted with: {}'.format(add_prob, 1-add_prob))
 
-    # Create the output file
-    filename = create_outputfile(iterations, add_prob, pref_attach_condition)
+    # One independent random stream per simulation, spawned from the root seed
+    root_stream = RandomStream(seed)
+    streams = root_stream.spawn(simulations)
+    print('Random seed: {}'.format(root_stream.seed))
+
+    params = experiment_params(EXP_CONDITION, iterations, simulations, add_prob, pref_attach_condition, PROBABILITIES)
+    if REGISTRY and not resume:
+        cached = Registry().lookup(params, root_stream.seed)
+        if cached is not None:
+            print('An identical run is in the registry, its output is {}'.format(cached['output']))
+            return
+
+    if resume:
+        filename = resume
+    else:
+        # Create the output file, with a checkpoint of the run that keeps track of the completed simulations
+        filename = create_outputfile(iterations, add_prob, pref_attach_condition, simulations, root_stream.seed)
+        run_state = {
+            'params': dict(params, seed=root_stream.seed, workers=workers),
+            'sims_done': 0,
+            'position': output_position(filename)
+        }
+        write_checkpoint(run_state, run_checkpoint_filename(filename))
+
+    # Drop the output of the simulation that was running when the run was interrupted, unless it continues
+    # from its own checkpoint, which drops the output written after that checkpoint
+    if workers > 1 or not os.path.exists(checkpoint_filename(filename, run_state['sims_done'])):
+        truncate_output(filename, run_state['position'])
 
     if LOGGING:
-        os.makedirs('./vid', exist_ok=True)
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+
+    gen = True if len(sys.argv) > 2 and sys.argv[2] == 'True' else False
+
+    if workers > 1:
+        # Fan the simulations out over a process pool, the results are written in sim order
+        print('Running {} simulations on {} workers...'.format(simulations, workers))
+        jobs = [{
+            'sim': sim, 'last': sim == simulations - 1, 'iterations': iterations, 'probabilities': dict(PROBABILITIES),
+            'add_prob': add_prob, 'pref_attach_condition': pref_attach_condition, 'rng': streams[sim], 'generate_files': gen,
+            'filename': '{}.sim{}{}'.format(os.path.splitext(filename)[0], sim, os.path.splitext(filename)[1]),
+            'checkpoint': checkpoint_filename(filename, sim),
+            'instrumentation': instrumentation_filename(filename, sim),
+            'profile': profile_basename(filename, sim)
+        } for sim in range(run_state['sims_done'], simulations)]
+        with Pool(workers) as pool:
+            for sim, part_filename, run_time in pool.imap(run_simulation, jobs):
+                print('Simulation {} of {} completed, took {} seconds.'.format(sim+1, simulations, run_time))
+                append_part(part_filename, filename)
+                finish_simulation(run_state, filename, sim, part_filename)
+    else:
+        for sim in range(run_state['sims_done'], simulations):
+            print('Simulation {} of {}'.format(sim+1, simulations))
 
-    for sim in range(simulations):
-        print('Simulation {} of {}'.format(sim+1, simulations))
+            checkpoint = checkpoint_filename(filename, sim)
+            if os.path.exists(checkpoint):
+                model = load_checkpoint(checkpoint)
+                print('Model loaded from checkpoint at step {}...\n'.format(model.step_n))
+            else:
+                # The output of every step is streamed to the output file during the run
+                recorder = create_recorder(filename, sim)
+                model = code_dev_simulation(iterations, FITNESS_METHOD, PROBABILITIES, EXP_CONDITION, add_prob, LOGGING, pref_attach_condition,
+                                            lazy_ast=LAZY_AST, rng=streams[sim], recorder=recorder, keep_lists=KEEP_LISTS,
+                                            log_writer=create_log_writer() if LOGGING else None, rejection_free=REJECTION_FREE,
+                                            instrumentation=Instrumentation() if INSTRUMENTATION else None)
 
-        model = code_dev_simulation(iterations, FITNESS_METHOD, PROBABILITIES, EXP_CONDITION, add_prob, LOGGING, pref_attach_condition)
+                print('Model instantiated...\n')
 
-        print('Model instantiated...\n')
+            print('Running model...')
 
-        print('Running model...')
+            start_time = time.time()
+            profiler = create_profiler()
+            model.run_model(Checkpointer(checkpoint, CHECKPOINT_STEPS, CHECKPOINT_SECONDS), profiler)
 
-        start_time = time.time()
-        model.run_model()
+            print('Model run completed..!\nTook {} seconds.\n'.format(time.time() - start_time))
+            write_instrumentation(model, instrumentation_filename(filename, sim))
+            write_profile(profiler, profile_basename(filename, sim))
 
-        print('Model run completed..!\nTook {} seconds.\n'.format(time.time() - start_time))
+            finish_simulation(run_state, filename, sim)
+            gather_results(model, gen)
 
-        gen = True if len(sys.argv) > 2 and sys.argv[2] == 'True' else False
-        gather_results(model, gen)
-        filename = append_outputfile_try(model, sim, filename, iterations, add_prob, pref_attach_condition)
+            if GRAPH:
+                visualize_graph(model.reference_graph)
 
-        if GRAPH:
-            visualize_graph(model.reference_graph)
+    os.remove(run_checkpoint_filename(filename))
+    if REGISTRY:
+        Registry().record(params, root_stream.seed, filename, time.time() - run_start)
 
     if CREATE_COMMITS_CSV:
         convert(filename)
 
+def experiment_params(exp_condition, iterations, simulations, add_prob, pref_attach_condition, probabilities):
+    """
+    Returns the parameters that determine the output of a run, for the checkpoint of the run and the registry
+    """
+    return {'exp_condition': exp_condition, 'fitness_method': FITNESS_METHOD, 'lazy_ast': LAZY_AST,
+            'rejection_free': REJECTION_FREE, 'output_format': OUTPUT_FORMAT,
+            'iterations': iterations, 'simulations': simulations, 'pref_attach_condition': pref_attach_condition,
+            'add_prob': add_prob, 'probabilities': dict(probabilities)}
+
+def run_simulation(job):
+    """
+    Runs one simulation in a worker process of the pool
+
+    All parameters are passed in the job, since the globals of a worker are not changed by the arguments.
+    Only the last simulation writes the gource log, java files and network graph, which are overwritten
+    by every simulation when running sequentially as well.
+    The output rows are streamed to a part file of the simulation, which is appended to the output file by
+    the main process, so the output file stays in sim order.
+
+    Args:
+        job (dict): sim, last, iterations, probabilities, add_prob, pref_attach_condition, rng, generate_files
+            filename of the part file, filename of the checkpoint, filename of the instrumentation summary
+            and the filename without extension of the profile
+
+    A simulation with a checkpoint continues from the checkpoint.
+
+    Returns:
+        (sim, filename of the part file, run time in seconds)
+    """
+    logging = LOGGING and job['last']
+    if logging:
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+
+    if os.path.exists(job['checkpoint']):
+        model = load_checkpoint(job['checkpoint'])
+    else:
+        # Start with an empty part file, a previous run may have left one behind
+        if os.path.exists(job['filename']):
+            os.remove(job['filename'])
+        recorder = create_recorder(job['filename'], job['sim'])
+        model = code_dev_simulation(job['iterations'], FITNESS_METHOD, job['probabilities'], EXP_CONDITION, job['add_prob'],
+                                    logging, job['pref_attach_condition'], lazy_ast=LAZY_AST, rng=job['rng'],
+                                    recorder=recorder, keep_lists=KEEP_LISTS, log_writer=create_log_writer() if logging else None,
+                                    rejection_free=REJECTION_FREE, instrumentation=Instrumentation() if INSTRUMENTATION else None)
+    start_time = time.time()
+    profiler = create_profiler()
+    model.run_model(Checkpointer(job['checkpoint'], CHECKPOINT_STEPS, CHECKPOINT_SECONDS), profiler)
+    run_time = time.time() - start_time
+    write_instrumentation(model, job['instrumentation'])
+    write_profile(profiler, job['profile'])
+
+    if job['last']:
+        gather_results(model, job['generate_files'])
+        if GRAPH:
+            visualize_graph(model.reference_graph)
+
+    return job['sim'], job['filename'], run_time
+
 def gather_results(model, generate_files):
     """
     Gathers and analyses model results
@@ -111,22 +284,27 @@ def gather_results(model, generate_files):
         - generate_files (bool): Indicates whether to generate the created java files
 
     """
+    removals, mean_cascade, max_cascade = model.cascade_stats()
+    print('Removals: {}, mean cascade size: {}, largest cascade: {} methods'.format(removals, mean_cascade, max_cascade))
+    print('Rejected actions: {} {}'.format(sum(model.rejections.values()), dict(model.rejections)))
+
     if (generate_files):
         if os.path.exists('output'):
             for root, _, files in os.walk('output'):
                 for name in files:
                     os.remove(os.path.join(root, name))
         os.makedirs('output/src', exist_ok=True)
-        for class_info in model.classes:
+        for class_info in model.java_classes():
             java_printer = JavaPrinter()
             class_info.accept(java_printer)
             with open(os.path.join('output/src', class_info.name + '.java'), 'w') as java_file:
                 java_file.write(java_printer.result)
 
-def create_outputfile(iterations, add_prob, pref_attach_condition):
+def create_outputfile(iterations, add_prob, pref_attach_condition, simulations=None, seed=None):
     """
     Creates an output file with the header, returns filename
     Columns are 'sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'
+    For the npz OUTPUT_FORMAT, a trace file is created with the run parameters as metadata instead
 
     return filename
     """
@@ -134,45 +312,152 @@ def create_outputfile(iterations, add_prob, pref_attach_condition):
     # Create folder
     os.makedirs('results', exist_ok=True)
     # Create file
-    filename = 'results/result_' + str(EXP_CONDITION) + '_fit' + str(FITNESS_METHOD) + '_its' + str(iterations) + '_addprob' + str(add_prob) + '_pref' + str(DEFAULT_PREF_ATTACH_CONDITION) + '_time' + str(datetime.datetime.now().strftime("%d_%H_%M_%S")) + '.csv'
+    filename = 'results/result_' + str(EXP_CONDITION) + '_fit' + str(FITNESS_METHOD) + '_its' + str(iterations) + '_addprob' + str(add_prob) + '_pref' + str(DEFAULT_PREF_ATTACH_CONDITION) + '_time' + str(datetime.datetime.now().strftime("%d_%H_%M_%S")) + '.' + OUTPUT_FORMAT
+
+    create_output(filename, {
+        'exp_condition': EXP_CONDITION, 'fitness_method': FITNESS_METHOD, 'iterations': iterations,
+        'simulations': simulations, 'add_prob': add_prob, 'pref_attach_condition': pref_attach_condition,
+        'probabilities': PROBABILITIES, 'lazy_ast': LAZY_AST, 'rejection_free': REJECTION_FREE, 'seed': seed
+    })
+    return filename
+
+def create_output(filename, metadata):
+    """
+    Creates an empty output file for the format of the file: a csv file with the header, or a trace file
+    with the run parameters (metadata) for the npz format
+    """
+    if os.path.splitext(filename)[1] == '.npz':
+        create_trace(filename, metadata)
+        return
+
     with open(filename, mode='w', newline='') as csv_file:
         writer = csv.writer(csv_file, delimiter=',')
         # Header
         writer.writerow(['sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'])
 
-    return filename
-
-def append_outputfile_try(model, sim, filename, iterations, add_prob, pref_attach_condition):
+def create_recorder(filename, sim):
+    """
+    Creates the recorder that streams the output of a simulation to the output file, for the format of the file
     """
-    Appends results from a simulation to the output file with one row per simulation step
-    Creates new file if there is a memory error
+    if os.path.splitext(filename)[1] == '.npz':
+        return TraceWriter(filename, sim, CHUNK_SIZE)
+    return StepRecorder(filename, sim, CHUNK_SIZE)
 
-    Returns filename
+def create_log_writer():
     """
-    # Try appending results to the previously created output file
-    try:
-        append_outputfile(model, sim, filename)
+    Creates the writer of the gource log, which starts a new log
+    """
+    return LogWriter(LOG_FILE, flush_lines=LOG_FLUSH_LINES, background=LOG_BACKGROUND)
 
-    # Create new file if there is a memoryerror and add entire simulation results
-    except MemoryError:
-        filename = create_outputfile(iterations, add_prob, pref_attach_condition)
-        append_outputfile(model, sim, filename)
+def append_outputfile(model, sim, filename):
+    """
+    Appends results from a simulation that kept its output in the analysis lists (keep_lists) to the output file,
+    with one row per simulation step
+    Columns are 'sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'
 
-    return filename
+    """
+    recorder = create_recorder(filename, sim)
+    for row in output_rows(model, sim):
+        recorder.record(row[1], row[2], row[3], row[4:9], row[9], row[10])
+    recorder.flush()
 
-def append_outputfile(model, sim, filename):
+def output_rows(model, sim):
     """
-    Appends results from a simulation to the output file with one row per simulation step
+    Generates the output rows of a simulation, one row per simulation step
     Columns are 'sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'
+    """
+    for row in range(len(model.list_fmin)):
+        yield [sim, row, model.list_fmin[row], model.list_action[row]] + model.list_fit_stats[row] + [
+            model.total_code_size[row]] + [model.changes[row]]
 
+def append_part(part_filename, filename):
     """
-    # Open file
-    with open(filename, mode='a', newline='') as csv_file:
-        writer = csv.writer(csv_file, delimiter=',')
-        # Write rows
-        for row in range(len(model.list_fmin)):
-            writer.writerow([sim, row, model.list_fmin[row], model.list_action[row]] + model.list_fit_stats[row] + [
-                model.total_code_size[row]] + [model.changes[row]])
+    Appends the rows of a part file to the output file
+    """
+    if os.path.splitext(filename)[1] == '.npz':
+        append_trace(part_filename, filename)
+        return
+
+    with open(part_filename, mode='r', newline='') as part_file, open(filename, mode='a', newline='') as csv_file:
+        shutil.copyfileobj(part_file, csv_file)
+
+def finish_simulation(run_state, filename, sim, part_filename=None):
+    """
+    Marks a simulation as completed in the checkpoint of the run, once all its rows are in the output file,
+    and removes the checkpoint (and part file) of the simulation
+    """
+    run_state['sims_done'] = sim + 1
+    run_state['position'] = output_position(filename)
+    write_checkpoint(run_state, run_checkpoint_filename(filename))
+
+    for name in [checkpoint_filename(filename, sim), part_filename]:
+        if name is not None and os.path.exists(name):
+            os.remove(name)
+
+def write_instrumentation(model, filename):
+    """
+    Writes the instrumentation summary of a simulation to a JSON file, if the model is instrumented
+    """
+    summary = model.instrumentation_summary()
+    if summary is not None:
+        write_summary(summary, filename)
+
+def instrumentation_filename(filename, sim):
+    """
+    Returns the filename of the instrumentation summary of a simulation, next to the output file
+    """
+    return '{}.sim{}.instrumentation.json'.format(os.path.splitext(filename)[0], sim)
+
+def create_profiler():
+    """
+    Creates the profiler of the PROFILE_STEPS window of a simulation, None when not profiling
+    """
+    if PROFILE_STEPS is None:
+        return None
+    return StepProfiler(PROFILE_STEPS[0], PROFILE_STEPS[1])
+
+def write_profile(profiler, basename):
+    """
+    Writes the .pstats and speedscope .json files of a profiled simulation and prints its hottest model functions
+    """
+    if profiler is not None and profiler.write(basename):
+        profiler.print_hot_functions(code_dev_simulation)
+        print('Profile written to {}.pstats and {}.speedscope.json'.format(basename, basename))
+
+def profile_basename(filename, sim):
+    """
+    Returns the filename without extension of the profile of a simulation, next to the output file
+    """
+    return '{}.sim{}'.format(os.path.splitext(filename)[0], sim)
+
+def checkpoint_filename(filename, sim):
+    """
+    Returns the filename of the checkpoint of a simulation, next to the output file
+    """
+    return '{}.sim{}.ckpt'.format(os.path.splitext(filename)[0], sim)
+
+def run_checkpoint_filename(filename):
+    """
+    Returns the filename of the checkpoint of the run, next to the output file
+    """
+    return os.path.splitext(filename)[0] + '.run.ckpt'
+
+def output_position(filename):
+    """
+    Returns the position up to which the output file is written, for the format of the file
+    """
+    if os.path.splitext(filename)[1] == '.npz':
+        return trace_position(filename)
+    return file_position(filename)
+
+def truncate_output(filename, position):
+    """
+    Drops the output written after a position returned by output_position()
+    """
+    if os.path.splitext(filename)[1] == '.npz':
+        truncate_trace(filename, position)
+    else:
+        truncate_file(filename, position)
 
 if __name__ == "__main__":
     run_repo_model()
@@ -0,0 +1,109 @@
+from math import sqrt
+
+from fitness_index import FitnessIndex
+
+
+class RunningStats:
+    """
+    Keeps the fitness statistics and the total code size of the model up to date incrementally,
+    so they can be saved every step without going over all methods
+
+    The count, sum and sum of squares of the fitnesses are updated on every change. The sums are
+    taken relative to a shift (the first fitness seen) to avoid cancellation in the variance and
+    are recomputed exactly from the fitness index every resync_interval changes.
+    The minimum comes from the fitness index of the model, the maximum from a second, reversed index
+    over the same store.
+
+    Args:
+        fitness_index (FitnessIndex): The fitness index of the model, kept up to date by this class,
+            which writes the fitnesses to the store of the index
+        resync_interval (int): Number of fitness changes after which the sums are recomputed exactly
+    """
+    def __init__(self, fitness_index, resync_interval=10000):
+        self.fitness_index = fitness_index
+        self.max_index = FitnessIndex(fitness_index.store, reverse=True)
+        self.resync_interval = resync_interval
+
+        self.shift = None
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.changes = 0
+        self.code_size = 0
+
+    def set_fitness(self, key, fitness):
+        """
+        Add a method with its fitness, or change the fitness of a method, in the store and the indexes
+
+        Args:
+            key (int): Id of the method
+            fitness (float): New fitness of the method
+        """
+        if self.shift is None:
+            self.shift = fitness
+
+        if key in self.fitness_index:
+            self._subtract(self.fitness_index.fitness(key))
+        else:
+            self.count += 1
+        self.sum += fitness - self.shift
+        self.sum_squares += (fitness - self.shift) ** 2
+
+        self.fitness_index.push(key, fitness)
+        self.max_index.push(key, fitness)
+        self._count_change()
+
+    def remove(self, key, lines=0):
+        """
+        Remove a method
+
+        Args:
+            key (int): Id of the method
+            lines (int): The lines of the method, which are subtracted from the code size
+        """
+        self._subtract(self.fitness_index.fitness(key))
+        self.count -= 1
+        self.fitness_index.remove(key)
+        self.max_index.remove(key)
+        self.code_size -= lines
+        self._count_change()
+
+    def add_lines(self, lines):
+        """
+        Add (or subtract for negative numbers) lines to the total code size
+        """
+        self.code_size += lines
+
+    def fitness_stats(self):
+        """
+        Returns a list of count, mean, std, min, max values of the fitnesses
+        """
+        fmin = self.fitness_index.top()[1]
+        fmax = self.max_index.top()[1]
+        if self.count == 1:
+            # Avoid rounding noise in the standard deviation of a single method
+            return [1, fmin, 0.0, fmin, fmax]
+
+        mean = self.sum / self.count
+        variance = max(self.sum_squares / self.count - mean ** 2, 0.0)
+        return [self.count, mean + self.shift, sqrt(variance), fmin, fmax]
+
+    def resync(self):
+        """
+        Recompute the sums exactly from the fitnesses in the index
+        """
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        for value in self.fitness_index.values():
+            self.sum += value - self.shift
+            self.sum_squares += (value - self.shift) ** 2
+        self.changes = 0
+
+    def _subtract(self, fitness):
+        self.sum -= fitness - self.shift
+        self.sum_squares -= (fitness - self.shift) ** 2
+
+    def _count_change(self):
+        self.changes += 1
+        if self.changes >= self.resync_interval:
+            self.resync()
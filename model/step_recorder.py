@@ -0,0 +1,87 @@
+import csv
+import os
+
+
+class StepRecorder:
+    """
+    Streams the per-step output rows of a simulation to the output file
+
+    Rows are buffered and appended to the file in chunks of chunk_size rows, so the memory
+    used for the output of a run is bounded by the chunk size instead of growing every step.
+    Columns are 'sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin', 'fmax', 'code_size', 'changes'
+
+    Args:
+        filename (string): File to append the rows to, the header is not written
+        sim (int): Number of the simulation, first column of every row
+        chunk_size (int): Number of rows that are buffered before they are written
+    """
+    def __init__(self, filename, sim, chunk_size=10000):
+        self.filename = filename
+        self.sim = sim
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.written = 0
+
+    def record(self, step, fmin, action, fit_stats, code_size, changes):
+        """
+        Record the state of one step, the buffer is written when it is full
+
+        Args:
+            step (int): Number of the step
+            fmin (float): Lowest fitness
+            action (string): Name of the action of the step
+            fit_stats (list<float>): count, mean, std, min and max of the fitnesses
+            code_size (int): Total lines of code
+            changes (int): Number of changed lines
+        """
+        self.rows.append([self.sim, step, fmin, action] + fit_stats + [code_size, changes])
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to the file
+        """
+        if not self.rows:
+            return
+        with open(self.filename, mode='a', newline='') as csv_file:
+            writer = csv.writer(csv_file, delimiter=',')
+            writer.writerows(self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def position(self):
+        """
+        Flush the buffer and return the position in the file up to which the rows are written,
+        e.g. to store it in a checkpoint
+
+        Returns:
+            Size of the file in bytes
+        """
+        self.flush()
+        return file_position(self.filename)
+
+    def truncate(self, position):
+        """
+        Drop the rows written after a position returned by position(), e.g. when resuming from a checkpoint
+        """
+        self.rows = []
+        truncate_file(self.filename, position)
+
+
+def file_position(filename):
+    """
+    Returns:
+        Size of a file in bytes, 0 if it does not exist
+    """
+    return os.path.getsize(filename) if os.path.exists(filename) else 0
+
+
+def truncate_file(filename, position):
+    """
+    Truncate a file to a size in bytes, the file is created if it does not exist
+    A file that is not longer than the size is left as it is
+    """
+    with open(filename, mode='a') as output_file:
+        if output_file.tell() > position:
+            output_file.truncate(position)
@@ -0,0 +1,216 @@
+"""
+Parameter sweep of the model: runs every configuration of a grid (or a list of configurations) for a number
+of replicates on a process pool
+
+Usage:
+    python sweep.py                     Run the sweep of GRID and REPLICATES below
+    python sweep.py sweep.json [4]      Run the sweep of a json file, on 4 workers
+
+A sweep file is a json object with a "grid" (parameter -> list of values) or a list of "configs" (parameter -> value),
+and optionally "replicates", "seed" and "workers". Parameters that are not given get the defaults of run.py.
+
+Every run writes its output to its own file in the sweep directory, results/sweep_<name>. The manifest.json of
+the directory lists the configuration, seed, output file and status of every run. Running an interrupted sweep
+again runs only the runs that are not done.
+
+A run is the same as a run of run.py with one simulation and the same seed. With run.REGISTRY, the runs are recorded
+in the experiment registry, and a run that is in the registry already is not run again: the manifest points to its output.
+"""
+
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import run
+from model import code_dev_simulation
+from random_stream import RandomStream
+from registry import Registry
+
+# Parameters of a configuration, the probabilities are the keys of run.PROBABILITIES
+PARAMETERS = ['iterations', 'exp_condition', 'pref_attach_condition', 'add_state'] + list(run.PROBABILITIES)
+
+GRID = {
+    'exp_condition': ['no_rec', 'delete_state'],
+    'pref_attach_condition': [0, 3],
+    'call_method': [0.3, 0.4]
+}
+REPLICATES = 5 # Number of runs of every configuration, replicate r of every configuration uses seed SEED + r
+SEED = 1
+WORKERS = 4 # Number of worker processes
+MANIFEST = 'manifest.json'
+
+
+def default_config():
+    """
+    Returns the configuration with the parameters of run.py
+    """
+    return dict(run.PROBABILITIES, iterations=run.DEFAULT_ITERATIONS, exp_condition=run.EXP_CONDITION,
+                pref_attach_condition=run.DEFAULT_PREF_ATTACH_CONDITION, add_state=run.ADD_STATE)
+
+
+def expand_grid(grid):
+    """
+    Returns the list of configurations of all combinations of the values in a grid, in the order of the grid
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def sweep_jobs(configs, replicates, seed):
+    """
+    Create the jobs of a sweep, one per configuration per replicate
+
+    Args:
+        configs (list<dict>): Configurations, missing parameters get the defaults of run.py
+        replicates (int): Number of runs of every configuration
+        seed (int): Seed of the first replicate
+
+    Returns:
+        List of jobs, dicts with the id, config, the parameters of the run as recorded in the registry, seed
+        and output file name (relative to the sweep directory)
+    """
+    jobs = []
+    for number, config in enumerate(configs):
+        unknown = set(config) - set(PARAMETERS)
+        if unknown:
+            raise ValueError('Unknown sweep parameters: {}'.format(', '.join(sorted(unknown))))
+        config = dict(default_config(), **config)
+        add_prob = config['add_state'] if config['exp_condition'] == 'delete_state' else 1
+        params = run.experiment_params(config['exp_condition'], config['iterations'], 1, add_prob,
+                                       config['pref_attach_condition'], {name: config[name] for name in run.PROBABILITIES})
+        for replicate in range(replicates):
+            job_id = 'config{}_seed{}'.format(number, seed + replicate)
+            jobs.append({'id': job_id, 'config': config, 'params': params, 'seed': seed + replicate,
+                         'file': job_id + '.' + run.OUTPUT_FORMAT})
+    return jobs
+
+
+def estimated_cost(job):
+    """
+    Estimate of the run time of a job, used to schedule the longest jobs first
+
+    The time of a step hardly grows with the size of the code (see benchmarks/scaling.py),
+    so the run time is about linear in the number of iterations
+    """
+    return job['config']['iterations']
+
+
+def pending_jobs(manifest, directory):
+    """
+    Returns the jobs of a manifest that are not done, with the output files joined to the sweep directory,
+    longest jobs first so the pool does not end waiting on one long job. Equally long jobs keep the order of the sweep
+    """
+    pending = [dict(job, file=os.path.join(directory, job['file'])) for job in manifest['jobs'].values()
+               if job['status'] != 'done']
+    return sorted(pending, key=estimated_cost, reverse=True)
+
+
+def run_job(job):
+    """
+    Runs the simulation of a job in a worker process of the pool, and streams its output to the output file
+
+    Args:
+        job (dict): Job of sweep_jobs(), with the file name joined to the sweep directory
+
+    Returns:
+        (id of the job, run time in seconds)
+    """
+    params = job['params']
+
+    # A run that was interrupted starts over with a new output file
+    run.create_output(job['file'], dict(params, seed=job['seed']))
+    # The simulation gets the stream run.py spawns from the seed for its first simulation
+    model = code_dev_simulation(params['iterations'], params['fitness_method'], dict(params['probabilities']),
+                                params['exp_condition'], params['add_prob'], False, params['pref_attach_condition'],
+                                lazy_ast=params['lazy_ast'], rng=RandomStream(job['seed']).spawn(1)[0],
+                                recorder=run.create_recorder(job['file'], 0), keep_lists=False,
+                                rejection_free=params['rejection_free'])
+    start_time = time.time()
+    model.run_model()
+    return job['id'], time.time() - start_time
+
+
+def read_manifest(directory):
+    """
+    Returns the manifest of a sweep directory, None if there is none
+    """
+    filename = os.path.join(directory, MANIFEST)
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as manifest_file:
+        return json.load(manifest_file)
+
+
+def write_manifest(manifest, directory):
+    """
+    Writes the manifest of a sweep directory, replacing the previous manifest only when it is completely written
+    """
+    filename = os.path.join(directory, MANIFEST)
+    with open(filename + '.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(filename + '.tmp', filename)
+
+
+def run_sweep(directory, configs, replicates=REPLICATES, seed=SEED, workers=WORKERS, registry=None):
+    """
+    Runs the jobs of a sweep that are not done yet on a process pool, longest jobs first, and keeps
+    the status of every job in the manifest of the sweep directory
+
+    Args:
+        directory (string): Sweep directory, for the manifest and the output files
+        configs (list<dict>): Configurations, missing parameters get the defaults of run.py
+        replicates (int): Number of runs of every configuration
+        seed (int): Seed of the first replicate
+        workers (int): Number of worker processes
+        registry (Registry): Registry to record the runs in and to look up identical runs, None to run every job
+
+    Returns:
+        The manifest
+    """
+    jobs = sweep_jobs(configs, replicates, seed)
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = read_manifest(directory)
+    if manifest is None:
+        manifest = {'created': datetime.datetime.now().isoformat(), 'replicates': replicates, 'seed': seed,
+                    'jobs': {job['id']: dict(job, status='pending') for job in jobs}}
+    elif [(job['id'], job['config']) for job in jobs] != [(job['id'], job['config']) for job in manifest['jobs'].values()]:
+        raise ValueError('{} contains another sweep'.format(directory))
+
+    if registry is not None:
+        for job in pending_jobs(manifest, directory):
+            cached = registry.lookup(job['params'], job['seed'])
+            if cached is not None:
+                manifest['jobs'][job['id']].update(status='done', file=cached['output'], cached=True)
+
+    pending = pending_jobs(manifest, directory)
+    write_manifest(manifest, directory)
+    print('Running {} of {} runs on {} workers...'.format(len(pending), len(jobs), workers))
+
+    with Pool(workers) as pool:
+        for job_id, run_time in pool.imap_unordered(run_job, pending):
+            job = manifest['jobs'][job_id]
+            job.update(status='done', run_seconds=run_time, finished=datetime.datetime.now().isoformat())
+            if registry is not None:
+                registry.record(job['params'], job['seed'], os.path.join(directory, job['file']), run_time)
+            write_manifest(manifest, directory)
+            done = sum(job['status'] == 'done' for job in manifest['jobs'].values())
+            print('Run {} completed ({} of {}), took {} seconds.'.format(job_id, done, len(jobs), run_time))
+    return manifest
+
+
+if __name__ == "__main__":
+    registry = Registry() if run.REGISTRY else None
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as sweep_file:
+            sweep = json.load(sweep_file)
+        run_sweep(os.path.join('results', 'sweep_' + os.path.splitext(os.path.basename(sys.argv[1]))[0]),
+                  sweep['configs'] if 'configs' in sweep else expand_grid(sweep['grid']),
+                  sweep.get('replicates', REPLICATES), sweep.get('seed', SEED),
+                  int(sys.argv[2]) if len(sys.argv) > 2 else sweep.get('workers', WORKERS), registry)
+    else:
+        run_sweep(os.path.join('results', 'sweep'), expand_grid(GRID), registry=registry)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from AST import AST
+
+
+class ASTTest(TestCase):
+    def test_delete_reference(self):
+        ast = AST()
+        java_class = ast.create_class()
+        method1 = ast.create_method(java_class)
+        method2 = ast.create_method(java_class)
+        method3 = ast.create_method(java_class)
+        ast.create_reference(method1, method2, java_class)
+        ast.add_statement(method1)
+        ast.create_reference(method1, method3, java_class)
+        self.assertTrue(ast.has_reference(method1, method2, java_class))
+        self.assertFalse(ast.has_reference(method2, method1, java_class))
+        self.assertEqual(3, ast.body_size(method1))
+
+        self.assertEqual(1, ast.delete_reference(method1, method2, java_class))
+        self.assertFalse(ast.has_reference(method1, method2, java_class))
+        self.assertEqual(2, ast.body_size(method1))
+        self.assertEqual(0, ast.delete_reference(method1, method2, java_class))
+
+        ast.flush()
+        self.assertEqual(2, len(method1.body))
+        self.assertEqual(method3.name, method1.body[1].expression.name)
+
+    def test_delete_statement(self):
+        ast = AST()
+        java_class = ast.create_class()
+        method = ast.create_method(java_class)
+        for _ in range(5):
+            ast.add_statement(method)
+        statements = list(method.body)
+
+        # The last declaration takes the slot of a deleted one, the body keeps its order
+        ast.delete_statement(method, statements[1])
+        self.assertEqual([statements[0], statements[4], statements[2], statements[3]], ast.declarations(method))
+        ast.delete_statement(method, statements[1])
+        ast.delete_statement(method, statements[3])
+        self.assertEqual(3, ast.body_size(method))
+
+        ast.flush()
+        self.assertEqual([statements[0], statements[2], statements[4]], method.body)
+        self.assertEqual([statements[0], statements[4], statements[2]], ast.declarations(method))
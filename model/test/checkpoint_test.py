@@ -0,0 +1,64 @@
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+from AST import AST
+from checkpoint import Checkpointer, load_checkpoint
+from model import code_dev_simulation
+from step_recorder import StepRecorder
+
+PROBABILITIES = {'create_method': 0.1, 'call_method': 0.4, 'update_method': 0.45, 'delete_method': 0.05,
+                 'create_class': 0.1}
+
+
+class CheckpointTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def create_model(self, filename, iterations, lazy_ast):
+        return code_dev_simulation(iterations, 0, PROBABILITIES, 'delete_state', 0.8, False, 0, lazy_ast=lazy_ast,
+                                   seed=3, recorder=StepRecorder(filename, 0, chunk_size=50), keep_lists=False)
+
+    def test_resume_is_identical(self):
+        for lazy_ast in [False, True]:
+            uninterrupted = os.path.join(self.directory, 'uninterrupted.csv')
+            resumed = os.path.join(self.directory, 'resumed.csv')
+            checkpoint = os.path.join(self.directory, 'resumed.ckpt')
+            for name in [uninterrupted, resumed]:
+                open(name, 'w').close()
+
+            model = self.create_model(uninterrupted, 1500, lazy_ast)
+            model.run_model()
+
+            # Stop the run after 1000 steps, the last checkpoint is at step 700
+            model = self.create_model(resumed, 1000, lazy_ast)
+            model.run_model(Checkpointer(checkpoint, steps=350))
+            model = load_checkpoint(checkpoint)
+            self.assertEqual(700, model.step_n)
+            model.iterations = 1500
+            model.run_model()
+
+            with open(uninterrupted) as expected, open(resumed) as result:
+                self.assertEqual(expected.read(), result.read())
+
+    def test_pickle_ast(self):
+        ast = AST()
+        java_class = ast.create_class()
+        caller = ast.create_method(java_class)
+        callee = ast.create_method(java_class)
+        for _ in range(3):
+            ast.create_reference(caller, callee, java_class)
+            ast.add_statement(caller)
+        ast.delete_reference(caller, callee, java_class)
+
+        java_class, ast = pickle.loads(pickle.dumps((java_class, ast)))
+        caller, callee = ast.class_methods(java_class)
+        self.assertEqual(3, ast.body_size(caller))
+        self.assertFalse(ast.has_reference(caller, callee, java_class))
+        ast.flush()
+        self.assertEqual(3, len(caller.body))
@@ -0,0 +1,19 @@
+from unittest import TestCase
+from model import code_dev_simulation
+
+PROBABILITIES = {'create_method': 0.2, 'call_method': 0.3, 'update_method': 0.35, 'delete_method': 0.15,
+                 'create_class': 0.3}
+
+
+class ClassIndexTest(TestCase):
+    def test_method_counts(self):
+        for lazy_ast in [False, True]:
+            model = code_dev_simulation(3000, 0, PROBABILITIES, 'delete_state', 0.8, False, 0, lazy_ast=lazy_ast, seed=4)
+            model.run_model()
+
+            self.assertEqual([len(model.AST.class_methods(java_class)) for java_class in model.classes.values()],
+                             model.get_method_amounts())
+            self.assertEqual(len(model.store), model.class_sampler.total)
+            self.assertEqual(len(model.classes), len(model.class_sampler))
+            for name, java_class in model.classes.items():
+                self.assertIs(java_class, model.store.class_nodes[model.class_ids[name]])
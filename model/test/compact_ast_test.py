@@ -0,0 +1,40 @@
+from unittest import TestCase
+from AST import AST
+from compact_ast import CompactAST
+from java_printer import JavaPrinter
+
+
+class CompactASTTest(TestCase):
+    def build(self, ast):
+        java_class = ast.create_class()
+        method1 = ast.create_method(java_class)
+        method2 = ast.create_method(java_class)
+        ast.add_statement(method1)
+        ast.create_reference(method1, method2, java_class)
+        ast.add_statement(method1)
+        ast.add_statement(method2)
+        ast.delete_statement(method1, ast.declarations(method1)[0])
+        ast.create_reference(method2, method1, java_class)
+        ast.delete_reference(method2, method1, java_class)
+        return ast, [java_class]
+
+    def test_materialize_matches_ast(self):
+        results = []
+        for ast, classes in [self.build(AST()), self.build(CompactAST())]:
+            printer = JavaPrinter()
+            for java_class in ast.materialize(classes):
+                java_class.accept(printer)
+            results.append(printer.result)
+            self.assertEqual(6, ast.counter)
+        self.assertEqual(results[0], results[1])
+        self.assertIn('int var4 = 4;', results[1])
+        self.assertNotIn('var3', results[1])
+        self.assertIn('Class_0.method_2();', results[1])
+
+    def test_body_size(self):
+        ast, classes = self.build(CompactAST())
+        method1, method2 = ast.class_methods(classes[0])
+        self.assertEqual(2, ast.body_size(method1))
+        self.assertEqual(1, ast.body_size(method2))
+        self.assertTrue(ast.has_reference(method1, method2, classes[0]))
+        self.assertFalse(ast.has_reference(method2, method1, classes[0]))
@@ -0,0 +1,44 @@
+import random
+from collections import Counter
+from unittest import TestCase
+from directory_index import DirectoryIndex
+
+
+class DirectoryIndexTest(TestCase):
+    def test_matches_dict(self):
+        index = DirectoryIndex()
+        directories = {}
+        rng = random.Random(2)
+        for i in range(2000):
+            name = 'Class_' + str(rng.randrange(40))
+            if name in directories and rng.random() < 0.4:
+                del index[name]
+                del directories[name]
+            else:
+                directories[name] = rng.choice(['', '/dir_1', '/dir_2', '/dir_1/dir_3'])
+                index[name] = directories[name]
+
+            self.assertEqual(len(directories), len(index))
+            self.assertEqual(list(directories.values()).count(''), index.empty)
+            self.assertEqual(sorted(value for value in directories.values() if value), sorted(index.paths))
+            for name in directories:
+                self.assertEqual(directories[name], index[name])
+                self.assertIn(name, index)
+
+    def test_sample(self):
+        index = DirectoryIndex()
+        for name, directory in [('A', ''), ('B', ''), ('C', '/dir_1'), ('D', '/dir_2'), ('E', '/dir_1')]:
+            index[name] = directory
+
+        samples = Counter(index.sample(u / 1000) for u in range(1000))
+        self.assertEqual({'': 400, '/dir_1': 400, '/dir_2': 200}, dict(samples))
+
+        # One of the two '' entries is left out
+        samples = Counter(index.sample_excluding_empty(u / 1000) for u in range(1000))
+        self.assertEqual({'': 250, '/dir_1': 500, '/dir_2': 250}, dict(samples))
+
+    def test_sample_excluding_only_empty(self):
+        index = DirectoryIndex()
+        index['A'] = ''
+        self.assertIsNone(index.sample_excluding_empty(0.5))
+        self.assertEqual('', index.sample(0.5))
@@ -0,0 +1,59 @@
+import random
+from types import SimpleNamespace
+from unittest import TestCase
+import numpy as np
+from fitness_index import FitnessIndex
+
+
+class FitnessIndexTest(TestCase):
+    def test_top_follows_updates(self):
+        store = SimpleNamespace(fitness=np.zeros(3))
+        index = FitnessIndex(store)
+        index.push(0, 0.5)
+        index.push(1, 0.2)
+        index.push(2, 0.9)
+        self.assertEqual((1, 0.2), index.top())
+        index.update(1, 0.95)
+        self.assertEqual((0, 0.5), index.top())
+        self.assertEqual(0.95, store.fitness[1])
+        index.remove(0)
+        self.assertNotIn(0, index)
+        self.assertEqual((2, 0.9), index.top())
+        self.assertEqual(2, len(index))
+
+    def test_matches_linear_scan(self):
+        # Both indexes write the fitnesses to the same store
+        store = SimpleNamespace(fitness=np.zeros(50))
+        index = FitnessIndex(store)
+        max_index = FitnessIndex(store, reverse=True)
+        fitnesses = {}
+        rng = random.Random(3)
+        for i in range(2000):
+            key = rng.randrange(50)
+            if key in fitnesses and rng.random() < 0.3:
+                del fitnesses[key]
+                index.remove(key)
+                max_index.remove(key)
+            else:
+                fitnesses[key] = rng.random()
+                index.push(key, fitnesses[key])
+                max_index.push(key, fitnesses[key])
+            if fitnesses:
+                self.assertEqual(min(fitnesses.values()), index.top()[1])
+                self.assertEqual(max(fitnesses.values()), max_index.top()[1])
+        self.assertEqual(len(fitnesses), len(index))
+
+    def test_empty(self):
+        self.assertEqual((None, None), FitnessIndex(SimpleNamespace(fitness=np.zeros(0))).top())
+
+    def test_store_grows(self):
+        store = SimpleNamespace(fitness=np.zeros(2))
+        index = FitnessIndex(store)
+        index.push(0, 0.5)
+        index.push(1, 0.4)
+        # The store replaces its fitness array when it grows
+        store.fitness = np.concatenate([store.fitness, np.zeros(2)])
+        index.push(3, 0.1)
+        index.update(0, 0.05)
+        self.assertEqual((0, 0.05), index.top())
+        self.assertEqual(0.1, store.fitness[3])
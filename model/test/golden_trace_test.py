@@ -0,0 +1,39 @@
+from unittest import TestCase
+import numpy as np
+from golden_trace import check_engine, compare_exact, compare_distribution, commit_sizes
+
+
+class GoldenTraceTest(TestCase):
+    def assertEngineMatches(self, engine):
+        failures = {condition: differences for condition, differences in check_engine(engine).items() if differences}
+        self.assertEqual({}, failures)
+
+    def test_default(self):
+        self.assertEngineMatches('default')
+
+    def test_lazy_ast(self):
+        self.assertEngineMatches('lazy_ast')
+
+    def test_rejection_free(self):
+        self.assertEngineMatches('rejection_free')
+
+    def test_compare_exact(self):
+        golden = {'action': np.array([0, 1, 2]), 'changes': np.array([1, 1, -1]), 'fmin': np.array([.1, .2, .3]),
+                  'code_size': np.array([5, 6, 5]), 'methods': np.array([3, 3, 3])}
+        trace = dict(golden, fmin=np.array([.1, .2, .4]), methods=np.array([3, 3]))
+        self.assertEqual([], compare_exact(golden, golden))
+        self.assertEqual(['fmin: step 2', 'methods: 2 steps instead of 3'], compare_exact(golden, trace))
+
+    def test_compare_distribution(self):
+        rng = np.random.default_rng(0)
+        golden = [{'changes': rng.choice([1, -1], 1000), 'code_size': np.arange(1000), 'fmin': rng.random(1000)}]
+        same = [dict(golden[0], changes=golden[0]['changes'][::-1])]
+        other = [{'changes': rng.choice([1, 2, -1], 1000), 'code_size': np.arange(0, 3000, 3), 'fmin': rng.random(1000)}]
+        self.assertEqual([], compare_distribution(golden, same))
+        differences = compare_distribution(golden, other)
+        self.assertEqual(['commit sizes', 'changes'], [difference.split(':')[0] for difference in differences])
+
+    def test_commit_sizes(self):
+        trace = {'code_size': np.array([3, 4, 2, 5, 6]), 'fmin': np.array([0, .5, 0, 0, .7])}
+        # Commits at step 1 (the initial 3 lines) and at step 4 (1 + 3 inserted, 2 deleted)
+        self.assertEqual([3, 4], list(commit_sizes(trace)))
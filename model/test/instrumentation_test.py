@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from model import code_dev_simulation
+from instrumentation import Instrumentation, write_summary
+
+PROBABILITIES = {'create_method': 0.05, 'call_method': 0.5, 'update_method': 0.3, 'delete_method': 0.15,
+                 'create_class': 0.1}
+
+
+class InstrumentationTest(TestCase):
+    def test_summary(self):
+        for rejection_free in [False, True]:
+            model = code_dev_simulation(1000, 0, PROBABILITIES, 'delete_state', 0.3, False, 0, seed=3,
+                                        rejection_free=rejection_free, instrumentation=Instrumentation())
+            model.run_model()
+            summary = model.instrumentation_summary()
+
+            # Every rejected action is counted as a call as well
+            self.assertEqual(1000, summary['steps'])
+            self.assertEqual(1000 + summary['rejections'], sum(action['calls'] for action in summary['actions'].values()))
+            self.assertEqual(sum(model.rejections.values()), summary['rejections'])
+            self.assertEqual(summary['actions']['remove_method']['calls'] - summary['actions']['remove_method']['rejections'],
+                             sum(summary['cascade_sizes'].values()))
+            self.assertEqual(['mutation', 'recording', 'selection'], sorted(summary['phases']))
+            self.assertAlmostEqual(summary['phases']['mutation'],
+                                   sum(action['seconds'] for action in summary['actions'].values()))
+
+    def test_same_run(self):
+        for rejection_free in [False, True]:
+            runs = []
+            for instrumentation in [None, Instrumentation()]:
+                model = code_dev_simulation(500, 0, PROBABILITIES, 'delete_state', 0.3, False, 0, seed=3,
+                                            rejection_free=rejection_free, instrumentation=instrumentation)
+                model.run_model()
+                runs.append((model.list_action, model.list_fmin, model.total_code_size, dict(model.rejections)))
+                if instrumentation is None:
+                    self.assertIsNone(model.instrumentation_summary())
+            self.assertEqual(runs[0], runs[1])
+
+    def test_write_summary(self):
+        model = code_dev_simulation(100, 0, PROBABILITIES, 'delete_state', 0.3, False, 0, seed=3,
+                                    instrumentation=Instrumentation())
+        model.run_model()
+        filename = os.path.join(tempfile.mkdtemp(), 'result.sim0.instrumentation.json')
+        write_summary(model.instrumentation_summary(), filename)
+        with open(filename) as summary_file:
+            self.assertEqual(100, json.load(summary_file)['steps'])
+        os.remove(filename)
+        os.rmdir(os.path.dirname(filename))
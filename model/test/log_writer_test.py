@@ -0,0 +1,57 @@
+import gzip
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+from log_writer import LogWriter
+
+
+class LogWriterTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def read(self, filename):
+        with (gzip.open(filename, 'rt') if filename.endswith('.gz') else open(filename)) as log_file:
+            return log_file.read()
+
+    def test_buffers_lines(self):
+        filename = os.path.join(self.directory, 'code.log')
+        writer = LogWriter(filename, flush_lines=3)
+        writer.write('a\n')
+        writer.write('b\n')
+        self.assertEqual('', self.read(filename))
+        writer.write('c\n')
+        writer.handle.flush()
+        self.assertEqual('a\nb\nc\n', self.read(filename))
+        writer.write('d\n')
+        writer.close()
+        self.assertEqual('a\nb\nc\nd\n', self.read(filename))
+
+        # A new writer starts a new log
+        LogWriter(filename).close()
+        self.assertEqual('', self.read(filename))
+
+    def test_truncate_and_pickle(self):
+        for name in ['code.log', 'code.log.gz']:
+            for background in [False, True]:
+                filename = os.path.join(self.directory, name)
+                writer = LogWriter(filename, flush_lines=2, background=background)
+                writer.write('a\n')
+                writer.write('b\n')
+                writer.write('c\n')
+                position = writer.position()
+                writer = pickle.loads(pickle.dumps(writer))
+                writer.write('d\n')
+                writer.write('e\n')
+                writer.close()
+                self.assertEqual('a\nb\nc\nd\ne\n', self.read(filename))
+
+                writer.truncate(position)
+                writer.write('f\n')
+                writer.close()
+                self.assertEqual('a\nb\nc\nf\n', self.read(filename))
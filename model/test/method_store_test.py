@@ -0,0 +1,61 @@
+from unittest import TestCase
+from types import SimpleNamespace
+from method_store import MethodStore
+
+
+class MethodStoreTest(TestCase):
+    def test_edges_and_removal(self):
+        store = MethodStore(capacity=2)
+        class_id = store.add_class(SimpleNamespace(name='Class_0'))
+        ids = [store.add(SimpleNamespace(name='method_' + str(i)), class_id, i / 10) for i in range(5)]
+        self.assertEqual(5, len(store))
+        self.assertTrue(store.add_edge(ids[0], ids[1]))
+        self.assertFalse(store.add_edge(ids[0], ids[1]))
+        store.add_edge(ids[2], ids[1])
+        store.add_edge(ids[1], ids[3])
+        self.assertEqual(2, store.in_degree[ids[1]])
+        self.assertEqual(1, store.out_degree[ids[1]])
+        self.assertEqual([ids[0], ids[2]], list(store.callers[ids[1]]))
+
+        store.remove(ids[1])
+        self.assertEqual(0, store.out_degree[ids[0]])
+        self.assertEqual(0, store.in_degree[ids[3]])
+        self.assertEqual(4, len(store))
+
+        # The free slot is reused
+        self.assertEqual(ids[1], store.add(SimpleNamespace(name='method_5'), class_id, 0.5))
+        count, mean, _, fmin, fmax = store.fitness_stats()
+        self.assertEqual((5, 0.0, 0.5), (count, fmin, fmax))
+        self.assertAlmostEqual(0.28, mean)
+
+    def test_to_graph(self):
+        store = MethodStore()
+        class_node = SimpleNamespace(name='Class_0')
+        class_id = store.add_class(class_node)
+        caller = store.add(SimpleNamespace(name='method_0'), class_id, 0.1)
+        callee = store.add(SimpleNamespace(name='method_1'), class_id, 0.2)
+        store.add_edge(caller, callee)
+        store.lines[caller] = 3
+        graph = store.to_graph()
+        self.assertEqual([('method_0', 'method_1')], list(graph.edges()))
+        self.assertIs(class_node, graph.nodes['method_0']['data']['class'])
+        self.assertEqual(3, graph.nodes['method_0']['data']['lines'])
+
+    def test_saturated_callers(self):
+        store = MethodStore()
+        class_id = store.add_class(SimpleNamespace(name='Class_0'))
+        ids = [store.add(SimpleNamespace(name='method_' + str(i)), class_id, 0.1) for i in range(3)]
+        store.add_edge(ids[0], ids[0])
+        store.add_edge(ids[0], ids[1])
+        self.assertEqual([], list(store.saturated_callers()))
+
+        # Calling itself does not count, calling both other methods does
+        store.add_edge(ids[0], ids[2])
+        store.add_edge(ids[1], ids[2])
+        self.assertEqual([ids[0]], list(store.saturated_callers()))
+
+        # Removing a callee saturates the caller that called every method but that one
+        store.remove(ids[0])
+        self.assertEqual([ids[1]], list(store.saturated_callers()))
+        store.add(SimpleNamespace(name='method_3'), class_id, 0.1)
+        self.assertEqual([], list(store.saturated_callers()))
@@ -0,0 +1,43 @@
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+from model import code_dev_simulation
+from profiling import StepProfiler
+
+PROBABILITIES = {'create_method': 0.1, 'call_method': 0.4, 'update_method': 0.45, 'delete_method': 0.05,
+                 'create_class': 0.1}
+
+
+class StepProfilerTest(TestCase):
+    def test_window(self):
+        model = code_dev_simulation(300, 0, PROBABILITIES, 'delete_state', 0.8, False, 0, seed=1)
+        profiler = StepProfiler(100, 200)
+        model.run_model(profiler=profiler)
+        self.assertEqual(100, profiler.steps)
+        self.assertFalse(profiler.enabled)
+
+        stats = pstats.Stats(profiler.profile)
+        steps = [data for function, data in stats.stats.items() if function[2] == 'step']
+        self.assertEqual(100, steps[0][1])
+
+        # The flame graph accounts for the profiled time, recursive calls are estimated
+        speedscope = profiler.speedscope('test', min_seconds=0)
+        profile = speedscope['profiles'][0]
+        self.assertEqual(len(profile['samples']), len(profile['weights']))
+        self.assertAlmostEqual(stats.total_tt, profile['endValue'], delta=stats.total_tt * 0.01)
+
+        directory = tempfile.mkdtemp()
+        basename = os.path.join(directory, 'result.sim0')
+        self.assertTrue(profiler.write(basename))
+        for extension in ['.pstats', '.speedscope.json']:
+            self.assertTrue(os.path.exists(basename + extension))
+            os.remove(basename + extension)
+        os.rmdir(directory)
+
+    def test_window_after_run(self):
+        model = code_dev_simulation(50, 0, PROBABILITIES, 'delete_state', 0.8, False, 0, seed=1)
+        profiler = StepProfiler(100, 200)
+        model.run_model(profiler=profiler)
+        self.assertEqual(0, profiler.steps)
+        self.assertFalse(profiler.write(os.path.join(tempfile.gettempdir(), 'unused')))
@@ -0,0 +1,24 @@
+from unittest import TestCase
+from random_stream import RandomStream
+
+
+class RandomStreamTest(TestCase):
+    def test_reproducible(self):
+        stream = RandomStream(42, block_size=8)
+        values = [stream.random() for _ in range(20)]
+        again = RandomStream(stream.seed, block_size=8)
+        self.assertEqual(values, [again.random() for _ in range(20)])
+        self.assertTrue(all(0 <= value < 1 for value in values))
+
+    def test_spawned_streams_differ(self):
+        first, second = RandomStream(1).spawn(2)
+        self.assertNotEqual([first.random() for _ in range(5)], [second.random() for _ in range(5)])
+        first_again = RandomStream(1).spawn(2)[0]
+        first = RandomStream(1).spawn(2)[0]
+        self.assertEqual([first.random() for _ in range(5)], [first_again.random() for _ in range(5)])
+
+    def test_randint_and_choice(self):
+        stream = RandomStream(3)
+        self.assertTrue(all(1 <= stream.randint(1, 10) < 10 for _ in range(200)))
+        self.assertEqual({0, 1, 2}, {stream.randint(3) for _ in range(200)})
+        self.assertEqual({'b'}, {stream.choice(['a', 'b', 'c'], p=[0, 1, 0]) for _ in range(50)})
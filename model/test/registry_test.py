@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+from registry import Registry, code_version, MODEL_DIR, SIMULATION_SOURCES
+
+
+class RegistryTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.registry = Registry(os.path.join(self.directory, 'registry.sqlite'))
+        self.output = os.path.join(self.directory, 'result.csv')
+        with open(self.output, 'w') as output_file:
+            output_file.write('sim,step\n')
+        self.params = {'exp_condition': 'reproduce', 'iterations': 100, 'pref_attach_condition': 2,
+                       'probabilities': {'call_method': 0.4, 'update_method': 0.45}}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lookup(self):
+        self.assertIsNone(self.registry.lookup(self.params, 7))
+        self.registry.record(self.params, 7, self.output, 1.5)
+
+        run = self.registry.lookup(dict(self.params, pref_attach_condition=2.0), 7)
+        self.assertEqual(self.output, run['output'])
+        self.assertEqual(self.params, run['params'])
+        self.assertEqual(7, run['seed'])
+        self.assertEqual(1.5, run['run_seconds'])
+        self.assertEqual(code_version(), run['code_version'])
+        self.assertIsNone(self.registry.lookup(self.params, 8))
+        self.assertIsNone(self.registry.lookup(dict(self.params, iterations=200), 7))
+
+        # A run of which the output is gone is run again
+        os.remove(self.output)
+        self.assertIsNone(self.registry.lookup(self.params, 7))
+
+    def test_runs(self):
+        # Seeds of fresh entropy do not fit in a 64 bit integer
+        seed = 2 ** 100 + 1
+        self.registry.record(self.params, seed, self.output)
+        self.registry.record(dict(self.params, pref_attach_condition=3), 1, self.output)
+        self.registry.record(dict(self.params, exp_condition='no_rec'), 1, self.output)
+
+        self.assertEqual([seed, 1], [run['seed'] for run in self.registry.runs(exp_condition='reproduce')])
+        self.assertEqual([1], [run['seed'] for run in self.registry.runs(exp_condition='reproduce', pref_attach_condition=3.0)])
+        self.assertEqual(3, len(self.registry.runs(call_method=0.4)))
+        self.assertEqual(2, len(self.registry.runs(seed=1)))
+        self.assertEqual([], self.registry.runs(add_prob=0.8))
+        self.assertEqual(3, len(self.registry.runs()))
+
+        # Recording the same run again replaces it
+        self.registry.record(self.params, seed, self.output, 2.0)
+        self.assertEqual(3, len(self.registry.runs()))
+
+    def test_simulation_sources(self):
+        # The model modules that are loaded with the model are all part of the code version, run.py is not
+        script = 'import sys, model\nfor module in list(sys.modules.values()):\n    print(getattr(module, "__file__", None))'
+        filenames = subprocess.check_output([sys.executable, '-c', script], cwd=MODEL_DIR, universal_newlines=True).split()
+        loaded = {os.path.basename(name) for name in filenames if os.path.dirname(name) == MODEL_DIR}
+        self.assertIn('method_store.py', loaded)
+        self.assertLessEqual(loaded, set(SIMULATION_SOURCES))
+        self.assertNotIn('run.py', SIMULATION_SOURCES)
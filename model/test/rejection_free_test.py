@@ -0,0 +1,31 @@
+from unittest import TestCase
+from model import code_dev_simulation
+
+PROBABILITIES = {'create_method': 0.05, 'call_method': 0.5, 'update_method': 0.3, 'delete_method': 0.15,
+                 'create_class': 0.1}
+
+
+class RejectionFreeTest(TestCase):
+    def test_no_rejections(self):
+        for pref_attach_condition in [0, 3]:
+            model = code_dev_simulation(2000, 0, PROBABILITIES, 'delete_state', 0.3, False, pref_attach_condition, seed=2)
+            model.run_model()
+            self.assertGreater(sum(model.rejections.values()), 0)
+
+            model = code_dev_simulation(2000, 0, PROBABILITIES, 'delete_state', 0.3, False, pref_attach_condition, seed=2,
+                                        rejection_free=True)
+            model.run_model()
+            self.assertEqual({}, dict(model.rejections))
+            self.assertNotIn(0, model.changes)
+
+    def test_feasible_probabilities(self):
+        model = code_dev_simulation(0, 0, PROBABILITIES, 'delete_state', 0.3, False, 3, seed=2, rejection_free=True)
+        while len(model.store) > 1:
+            model.remove_method()
+        method_id = model.pick_unfit_method()
+        while model.AST.declarations(model.store.methods[method_id]):
+            model.AST.delete_statement(model.store.methods[method_id], model.AST.declarations(model.store.methods[method_id])[0])
+
+        # A single method can not call another method, can not be removed and can only get a statement added
+        self.assertEqual([method_id], list(model.store.saturated_callers()))
+        self.assertEqual([0.05, 0.0, 0.3 * 0.3, 0], model.get_feasible_probabilities())
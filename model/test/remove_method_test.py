@@ -0,0 +1,31 @@
+import sys
+from unittest import TestCase
+from model import code_dev_simulation
+
+PROBABILITIES = {'create_method': 0.1, 'call_method': 0.4, 'update_method': 0.45, 'delete_method': 0.05,
+                 'create_class': 0.1}
+
+
+class RemoveMethodTest(TestCase):
+    def test_long_cascade(self):
+        model = code_dev_simulation(0, 0, PROBABILITIES, 'no_rec', 1, False, 0, seed=1)
+        methods = len(model.store)
+        java_class = next(iter(model.classes.values()))
+        class_id = model.class_ids[java_class.name]
+
+        # A chain of methods that each only call the previous one, longer than the recursion limit
+        length = sys.getrecursionlimit() + 100
+        ids = []
+        for _ in range(length):
+            method = model.AST.create_method(java_class)
+            ids.append(model.add_method(method, class_id))
+            if len(ids) > 1:
+                model.AST.create_reference(method, model.store.methods[ids[-2]], java_class)
+                model.store.add_edge(ids[-1], ids[-2])
+                model.update_weights(ids[-1])
+                model.update_weights(ids[-2])
+
+        self.assertEqual(-length, model.remove_method(ids[0]))
+        self.assertEqual(methods, len(model.store))
+        self.assertEqual({length: 1}, dict(model.cascade_sizes))
+        self.assertEqual([1, length, length], model.cascade_stats())
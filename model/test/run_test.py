@@ -0,0 +1,45 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase, mock
+import run
+
+
+class RunTest(TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def run_repo_model(self, workers):
+        """
+        Run 2 simulations of 200 steps with seed 5 on a number of workers, without the logs, graphs and registry
+
+        Returns:
+            Content of the output file
+        """
+        argv = ['run.py', '200', 'False', '2', '0.1', '0.1', '0.4', '0.45', '0.05', '0', '5', str(workers)]
+        with mock.patch.object(sys, 'argv', argv), \
+                mock.patch.multiple(run, LOGGING=False, GRAPH=False, CREATE_COMMITS_CSV=False, REGISTRY=False,
+                                    OUTPUT_FORMAT='csv', CHECKPOINT_STEPS=None, CHECKPOINT_SECONDS=None):
+            run.run_repo_model()
+        filename, = glob.glob(os.path.join('results', '*.csv'))
+        with open(filename) as output_file:
+            output = output_file.read()
+        # The name of the output file has the time in seconds, the next run should not overwrite it
+        shutil.rmtree('results')
+        return output
+
+    def test_workers_give_identical_output(self):
+        sequential = self.run_repo_model(1)
+        parallel = self.run_repo_model(2)
+        self.assertEqual(sequential, parallel)
+
+        # The rows of the simulations are in sim order
+        self.assertEqual(['sim'] + ['0'] * 200 + ['1'] * 200, [line.split(',')[0] for line in parallel.splitlines()])
@@ -0,0 +1,36 @@
+import random
+from types import SimpleNamespace
+from unittest import TestCase
+import numpy as np
+from fitness_index import FitnessIndex
+from running_stats import RunningStats
+
+
+class RunningStatsTest(TestCase):
+    def test_matches_numpy(self):
+        stats = RunningStats(FitnessIndex(SimpleNamespace(fitness=np.zeros(30))), resync_interval=97)
+        fitnesses = {}
+        rng = random.Random(1)
+        for i in range(3000):
+            key = rng.randrange(30)
+            if key in fitnesses and len(fitnesses) > 1 and rng.random() < 0.3:
+                stats.remove(key)
+                del fitnesses[key]
+            else:
+                fitnesses[key] = rng.random()
+                stats.set_fitness(key, fitnesses[key])
+
+            values = np.array(list(fitnesses.values()))
+            expected = [len(values), values.mean(), values.std(), values.min(), values.max()]
+            for value, expected_value in zip(stats.fitness_stats(), expected):
+                self.assertAlmostEqual(expected_value, value, places=10)
+
+    def test_code_size(self):
+        stats = RunningStats(FitnessIndex(SimpleNamespace(fitness=np.zeros(2))))
+        stats.set_fitness(0, 0.3)
+        stats.set_fitness(1, 0.6)
+        stats.add_lines(5)
+        stats.add_lines(-1)
+        stats.remove(1, lines=3)
+        self.assertEqual(1, stats.code_size)
+        self.assertEqual([1, 0.3, 0.0, 0.3, 0.3], stats.fitness_stats())
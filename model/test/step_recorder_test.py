@@ -0,0 +1,37 @@
+import csv
+import os
+import tempfile
+from unittest import TestCase
+from step_recorder import StepRecorder
+
+
+class StepRecorderTest(TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def read_rows(self):
+        with open(self.filename, newline='') as csv_file:
+            return list(csv.reader(csv_file))
+
+    def test_writes_in_chunks(self):
+        recorder = StepRecorder(self.filename, 2, chunk_size=3)
+        for step in range(7):
+            recorder.record(step, 0.5, 'update_method', [4, 0.5, 0.1, 0.25, 0.75], 10 + step, 1)
+            self.assertLess(len(recorder.rows), 3)
+        self.assertEqual(6, recorder.written)
+        self.assertEqual(6, len(self.read_rows()))
+
+        recorder.flush()
+        rows = self.read_rows()
+        self.assertEqual(7, len(rows))
+        self.assertEqual(['2', '6', '0.5', 'update_method', '4', '0.5', '0.1', '0.25', '0.75', '16', '1'], rows[-1])
+
+    def test_flush_empty(self):
+        recorder = StepRecorder(self.filename, 0)
+        recorder.flush()
+        self.assertEqual(0, recorder.written)
+        self.assertEqual([], self.read_rows())
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from sweep import expand_grid, sweep_jobs, pending_jobs, run_sweep, read_manifest
+from trace_file import read_results
+from model import code_dev_simulation
+from random_stream import RandomStream
+from registry import Registry
+import run
+
+
+class SweepTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_expand_grid(self):
+        self.assertEqual([{'exp_condition': 'no_rec', 'iterations': 10}, {'exp_condition': 'no_rec', 'iterations': 20},
+                          {'exp_condition': 'delete_state', 'iterations': 10},
+                          {'exp_condition': 'delete_state', 'iterations': 20}],
+                         expand_grid({'exp_condition': ['no_rec', 'delete_state'], 'iterations': [10, 20]}))
+
+    def test_sweep_jobs(self):
+        jobs = sweep_jobs([{'call_method': 0.3}, {'iterations': 10}], 2, 5)
+        self.assertEqual(['config0_seed5', 'config0_seed6', 'config1_seed5', 'config1_seed6'], [job['id'] for job in jobs])
+        self.assertEqual(0.3, jobs[0]['config']['call_method'])
+        self.assertEqual(run.PROBABILITIES['update_method'], jobs[0]['config']['update_method'])
+        self.assertEqual(10, jobs[2]['config']['iterations'])
+        self.assertEqual(6, jobs[3]['seed'])
+        self.assertRaises(ValueError, sweep_jobs, [{'call_methods': 0.3}], 1, 0)
+
+    def test_pending_jobs(self):
+        jobs = sweep_jobs([{'iterations': 10}, {'iterations': 30}, {'iterations': 20}], 2, 0)
+        manifest = {'jobs': {job['id']: dict(job, status='pending') for job in jobs}}
+        manifest['jobs']['config1_seed0']['status'] = 'done'
+        pending = pending_jobs(manifest, self.directory)
+        self.assertEqual(['config1_seed1', 'config2_seed0', 'config2_seed1', 'config0_seed0', 'config0_seed1'],
+                         [job['id'] for job in pending])
+        self.assertEqual(os.path.join(self.directory, 'config1_seed1.' + run.OUTPUT_FORMAT), pending[0]['file'])
+
+    def test_run_sweep(self):
+        configs = [{'exp_condition': 'delete_state', 'iterations': 50}, {'exp_condition': 'no_rec', 'iterations': 100}]
+        manifest = run_sweep(self.directory, configs, replicates=2, seed=3, workers=2)
+        self.assertEqual(['done'] * 4, [job['status'] for job in manifest['jobs'].values()])
+        self.assertEqual(manifest, read_manifest(self.directory))
+
+        # Every run has its own output file, with the output of the first simulation of run.py with the seed of the run
+        data = read_results(os.path.join(self.directory, 'config1_seed4.' + run.OUTPUT_FORMAT))
+        model = code_dev_simulation(100, 0, dict(run.PROBABILITIES), 'no_rec', 1, False, run.DEFAULT_PREF_ATTACH_CONDITION,
+                                    rng=RandomStream(4).spawn(1)[0])
+        model.run_model()
+        self.assertEqual(model.total_code_size, list(data['code_size']))
+
+        # A sweep that is done runs nothing again, another sweep can not use the same directory
+        manifest['jobs']['config0_seed3']['status'] = 'pending'
+        self.assertEqual(['config0_seed3'], [job['id'] for job in pending_jobs(manifest, self.directory)])
+        self.assertEqual(read_manifest(self.directory), run_sweep(self.directory, configs, replicates=2, seed=3, workers=2))
+        self.assertRaises(ValueError, run_sweep, self.directory, configs, replicates=3, seed=3, workers=2)
+
+    def test_registry(self):
+        registry = Registry(os.path.join(self.directory, 'registry.sqlite'))
+        configs = [{'exp_condition': 'no_rec', 'iterations': 50}]
+        first = run_sweep(os.path.join(self.directory, 'first'), configs, replicates=2, seed=3, workers=2, registry=registry)
+        self.assertEqual(2, len(registry.runs(exp_condition='no_rec', iterations=50)))
+
+        # The runs of an identical sweep are in the registry, and are not run again
+        second = run_sweep(os.path.join(self.directory, 'second'), configs + [{'exp_condition': 'no_rec', 'iterations': 60}],
+                           replicates=2, seed=3, workers=2, registry=registry)
+        self.assertTrue(second['jobs']['config0_seed3']['cached'])
+        self.assertEqual(os.path.join(self.directory, 'first', first['jobs']['config0_seed3']['file']),
+                         second['jobs']['config0_seed3']['file'])
+        self.assertNotIn('cached', second['jobs']['config1_seed3'])
+        self.assertEqual(4, len(registry.runs(exp_condition='no_rec')))
@@ -0,0 +1,93 @@
+import os
+import tempfile
+from multiprocessing import Process
+from unittest import TestCase, mock
+import numpy as np
+from trace_file import COLUMNS, TraceWriter, create_trace, append_trace, read_trace, read_metadata, trace_position, \
+    truncate_trace
+
+
+def append_killed(part_filename, filename):
+    """
+    Appends a trace file of two chunks to another, and kills the process while its last array is written
+    """
+    write_array = np.lib.format.write_array
+    written = []
+
+    def write_and_kill(*args, **kwargs):
+        if len(written) == 2 * len(COLUMNS) - 1:
+            os._exit(1)
+        write_array(*args, **kwargs)
+        written.append(True)
+
+    with mock.patch('numpy.lib.format.write_array', write_and_kill):
+        append_trace(part_filename, filename)
+
+
+class TraceFileTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'result.npz')
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def record_steps(self, writer, steps):
+        actions = ['create_method', 'call_method', 'update_method', 'remove_method']
+        for step in range(steps):
+            writer.record(step, step / steps, actions[step % 4], [step + 1, 0.5, 0.25, step / steps, 0.75],
+                          3 * step, step % 5 - 2)
+        writer.flush()
+
+    def test_round_trip(self):
+        create_trace(self.filename, {'iterations': 7, 'probabilities': {'call_method': 0.4}})
+        self.record_steps(TraceWriter(self.filename, 0, chunk_size=3), 7)
+        self.record_steps(TraceWriter(self.filename, 1, chunk_size=3), 7)
+
+        data = read_trace(self.filename)
+        self.assertEqual(['sim', 'step', 'fmin', 'action', 'fnum', 'fmean', 'fstd', 'fmin.1', 'fmax', 'code_size',
+                          'changes'], list(data.columns))
+        self.assertEqual([0] * 7 + [1] * 7, list(data['sim']))
+        self.assertEqual(list(range(7)) * 2, list(data['step']))
+        self.assertEqual('remove_method', data['action'].iloc[3])
+        self.assertEqual(np.float32, data['fmin'].dtype)
+        self.assertEqual(np.int8, data['action'].cat.codes.dtype)
+        self.assertEqual([-2, -1, 0, 1, 2, -2, -1], list(data['changes'].iloc[:7]))
+        self.assertEqual(0.4, data.attrs['metadata']['probabilities']['call_method'])
+        self.assertEqual(7, read_metadata(self.filename)['iterations'])
+
+    def test_append_trace(self):
+        create_trace(self.filename, {})
+        part_filename = os.path.join(self.directory, 'result.sim1.npz')
+        self.record_steps(TraceWriter(self.filename, 0, chunk_size=4), 5)
+        self.record_steps(TraceWriter(part_filename, 1, chunk_size=4), 6)
+        append_trace(part_filename, self.filename)
+
+        data = read_trace(self.filename, columns=['sim', 'step'])
+        self.assertEqual(['sim', 'step'], list(data.columns))
+        self.assertEqual([0] * 5 + [1] * 6, list(data['sim']))
+        self.assertEqual(list(range(5)) + list(range(6)), list(data['step']))
+
+    def test_killed_append(self):
+        create_trace(self.filename, {})
+        part_filename = os.path.join(self.directory, 'result.sim1.npz')
+        self.record_steps(TraceWriter(self.filename, 0, chunk_size=4), 5)
+        self.record_steps(TraceWriter(part_filename, 1, chunk_size=10000), 20000)
+        position = trace_position(self.filename)
+
+        process = Process(target=append_killed, args=(part_filename, self.filename))
+        process.start()
+        process.join()
+        self.assertEqual(1, process.exitcode)
+
+        # The trace file still has the rows written before the append
+        self.assertEqual([0] * 5, list(read_trace(self.filename, columns=['sim'])['sim']))
+
+        # Resuming drops the chunks after the position of the checkpoint and appends the part file again
+        truncate_trace(self.filename, position)
+        append_trace(part_filename, self.filename)
+        data = read_trace(self.filename, columns=['sim', 'step'])
+        self.assertEqual([0] * 5 + [1] * 20000, list(data['sim']))
+        self.assertEqual(list(range(5)) + list(range(20000)), list(data['step']))
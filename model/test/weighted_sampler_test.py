@@ -0,0 +1,72 @@
+import random
+from unittest import TestCase
+from weighted_sampler import WeightedSampler
+
+
+class WeightedSamplerTest(TestCase):
+    def test_sample_follows_cumulative_weights(self):
+        sampler = WeightedSampler(capacity=4)
+        sampler.add('a', 1)
+        sampler.add('b', 3)
+        sampler.add('c', 0)
+        sampler.add('d', 4)
+        self.assertEqual(8, sampler.total)
+        self.assertEqual('a', sampler.sample(0))
+        self.assertEqual('b', sampler.sample(1 / 8))
+        self.assertEqual('b', sampler.sample(3.9 / 8))
+        self.assertEqual('d', sampler.sample(4 / 8))
+        self.assertEqual('d', sampler.sample(0.999999999))
+
+    def test_grow_and_reuse_slots(self):
+        sampler = WeightedSampler(capacity=2)
+        weights = {}
+        rng = random.Random(5)
+        for i in range(500):
+            key = rng.randrange(40)
+            if key in weights and rng.random() < 0.4:
+                sampler.remove(key)
+                del weights[key]
+            elif key in weights:
+                weights[key] = rng.randrange(10)
+                sampler.set_weight(key, weights[key])
+            else:
+                weights[key] = rng.randrange(10)
+                sampler.add(key, weights[key])
+        self.assertEqual(sum(weights.values()), sampler.total)
+        self.assertEqual(set(weights), set(sampler.keys))
+        for key, weight in weights.items():
+            self.assertEqual(weight, sampler.weight(key))
+
+        # Every key with a positive weight covers exactly its own share of [0, 1)
+        counts = {}
+        steps = sampler.total * 10
+        for i in range(steps):
+            key = sampler.sample((i + 0.5) / steps)
+            counts[key] = counts.get(key, 0) + 1
+        self.assertEqual({key: weight * 10 for key, weight in weights.items() if weight > 0}, counts)
+
+    def test_sample_uniform(self):
+        sampler = WeightedSampler()
+        for key in 'abc':
+            sampler.add(key, 1)
+        sampler.remove('a')
+        self.assertEqual({'b', 'c'}, {sampler.sample_uniform(u) for u in (0, 0.49, 0.5, 0.99)})
+
+    def test_sample_excluding(self):
+        sampler = WeightedSampler(capacity=4)
+        for key, weight in zip('abcde', [2, 1, 3, 1, 3]):
+            sampler.add(key, weight)
+        total = sampler.total
+        excluded = ['c', 'a']
+        drawn = [sampler.sample_excluding((i + 0.5) / 5, excluded) for i in range(5)]
+        self.assertEqual(['b', 'd', 'e', 'e', 'e'], drawn)
+        self.assertEqual(total, sampler.total)
+        self.assertIsNone(sampler.sample_excluding(0.5, list('abcde')))
+
+    def test_sample_uniform_excluding(self):
+        sampler = WeightedSampler()
+        for key in 'abcd':
+            sampler.add(key, 1)
+        drawn = [sampler.sample_uniform_excluding(u, ['a', 'c']) for u in (0, 0.49, 0.5, 0.99)]
+        self.assertEqual(['b', 'b', 'd', 'd'], drawn)
+        self.assertIsNone(sampler.sample_uniform_excluding(0.1, list('abcd')))
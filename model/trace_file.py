@@ -0,0 +1,268 @@
+import json
+import os
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Columns of the output, with the dtype they are stored with in a trace file.
+# The second fmin (of the fitness stats) is named 'fmin.1', like pandas names it when reading the csv output
+COLUMNS = [
+    ('sim', np.int16),
+    ('step', np.int32),
+    ('fmin', np.float32),
+    ('action', np.int8),
+    ('fnum', np.int32),
+    ('fmean', np.float32),
+    ('fstd', np.float32),
+    ('fmin.1', np.float32),
+    ('fmax', np.float32),
+    ('code_size', np.int32),
+    ('changes', np.int32)
+]
+
+# The action column is stored as the index of the action in this list
+ACTIONS = ['create_method', 'call_method', 'update_method', 'remove_method', 'delete_method', 'create_class']
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+METADATA_NAME = 'metadata.json'
+
+
+def create_trace(filename, metadata):
+    """
+    Create an empty trace file with the run parameters as metadata
+
+    A trace file is a (deflated) .npz archive with one .npy array per column per chunk of rows,
+    named 'chunk<number>/<column>.npy', and the metadata as json
+
+    Args:
+        filename (string): Name of the file, should end with .npz
+        metadata (dict): Parameters of the run, should be serializable to json
+    """
+    metadata = dict(metadata, columns=[name for name, _ in COLUMNS], actions=ACTIONS)
+    with zipfile.ZipFile(filename, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(METADATA_NAME, json.dumps(metadata))
+
+
+class TraceWriter:
+    """
+    Streams the per-step output rows of a simulation to a trace file, in the same way as StepRecorder
+    does for the csv output
+
+    Every chunk of chunk_size rows is written as a new chunk of compact column arrays.
+
+    Args:
+        filename (string): Trace file to append the chunks to
+        sim (int): Number of the simulation
+        chunk_size (int): Number of rows that are buffered before they are written
+    """
+    def __init__(self, filename, sim, chunk_size=10000):
+        self.filename = filename
+        self.sim = sim
+        self.chunk_size = chunk_size
+        self.columns = {name: [] for name, _ in COLUMNS}
+        self.written = 0
+
+    def record(self, step, fmin, action, fit_stats, code_size, changes):
+        """
+        Record the state of one step, the buffer is written when it is full
+
+        Args:
+            step (int): Number of the step
+            fmin (float): Lowest fitness
+            action (string): Name of the action of the step
+            fit_stats (list<float>): count, mean, std, min and max of the fitnesses
+            code_size (int): Total lines of code
+            changes (int): Number of changed lines
+        """
+        row = [self.sim, step, fmin, ACTION_CODES[action]] + fit_stats + [code_size, changes]
+        for (name, _), value in zip(COLUMNS, row):
+            self.columns[name].append(value)
+        if len(self.columns['step']) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to the file, as a new chunk
+        """
+        length = len(self.columns['step'])
+        if not length:
+            return
+        write_chunk(self.filename, {name: np.array(self.columns[name], dtype=dtype) for name, dtype in COLUMNS})
+        self.written += length
+        self.columns = {name: [] for name, _ in COLUMNS}
+
+    def position(self):
+        """
+        Flush the buffer and return the position in the file up to which the rows are written,
+        e.g. to store it in a checkpoint
+
+        Returns:
+            Number of chunks in the file
+        """
+        self.flush()
+        return trace_position(self.filename)
+
+    def truncate(self, position):
+        """
+        Drop the chunks written after a position returned by position(), e.g. when resuming from a checkpoint
+        """
+        self.columns = {name: [] for name, _ in COLUMNS}
+        truncate_trace(self.filename, position)
+
+
+def chunk_names(archive):
+    """
+    Returns:
+        Sorted list of the chunk names in an opened trace file
+    """
+    return sorted({name.split('/')[0] for name in archive.namelist() if name.startswith('chunk')})
+
+
+def write_chunk(filename, arrays):
+    """
+    Append a chunk of column arrays to a trace file
+
+    Args:
+        filename (string): Name of the trace file
+        arrays (dict<string, numpy.ndarray>): Array per column
+    """
+    write_chunks(filename, [arrays])
+
+
+def write_chunks(filename, chunks):
+    """
+    Append chunks of column arrays to a trace file
+
+    Appending to a zip archive in place overwrites its central directory, so a run that is killed during
+    the append would leave a file that cannot be read. The chunks are appended to a copy of the trace file
+    instead, which replaces the trace file when it is completely written
+
+    Args:
+        filename (string): Name of the trace file
+        chunks (iterable<dict<string, numpy.ndarray>>): Chunks, with an array per column
+    """
+    if os.path.exists(filename):
+        shutil.copyfile(filename, filename + '.tmp')
+    with zipfile.ZipFile(filename + '.tmp', mode='a', compression=zipfile.ZIP_DEFLATED) as archive:
+        number = len(chunk_names(archive))
+        for arrays in chunks:
+            chunk = 'chunk{:08d}'.format(number)
+            for name, array in arrays.items():
+                with archive.open('{}/{}.npy'.format(chunk, name), mode='w', force_zip64=True) as array_file:
+                    np.lib.format.write_array(array_file, array, allow_pickle=False)
+            number += 1
+    os.replace(filename + '.tmp', filename)
+
+
+def read_chunks(filename, columns=None):
+    """
+    Generator over the chunks of a trace file, in the order they were written
+
+    Args:
+        filename (string): Name of the trace file
+        columns (list<string>): Columns to read, None for all columns
+
+    Returns:
+        Generator of dicts with an array per column
+    """
+    columns = columns if columns is not None else [name for name, _ in COLUMNS]
+    with zipfile.ZipFile(filename) as archive:
+        for chunk in chunk_names(archive):
+            arrays = {}
+            for name in columns:
+                with archive.open('{}/{}.npy'.format(chunk, name)) as array_file:
+                    arrays[name] = np.lib.format.read_array(array_file, allow_pickle=False)
+            yield arrays
+
+
+def append_trace(part_filename, filename):
+    """
+    Appends the chunks of a trace file to another trace file
+
+    Args:
+        part_filename (string): Trace file to copy the chunks from
+        filename (string): Trace file to append the chunks to
+    """
+    write_chunks(filename, read_chunks(part_filename))
+
+
+def trace_position(filename):
+    """
+    Returns:
+        Number of chunks in a trace file, 0 if it does not exist
+    """
+    if not os.path.exists(filename):
+        return 0
+    with zipfile.ZipFile(filename) as archive:
+        return len(chunk_names(archive))
+
+
+def truncate_trace(filename, position):
+    """
+    Drop all chunks after the first position chunks of a trace file
+
+    A zip archive cannot be truncated in place, so the kept entries are copied to a temporary
+    file which replaces the trace file
+
+    Args:
+        filename (string): Name of the trace file
+        position (int): Number of chunks to keep
+    """
+    if trace_position(filename) <= position:
+        return
+    with zipfile.ZipFile(filename) as archive, \
+            zipfile.ZipFile(filename + '.tmp', mode='w', compression=zipfile.ZIP_DEFLATED) as truncated:
+        keep = set(chunk_names(archive)[:position])
+        for info in archive.infolist():
+            if not info.filename.startswith('chunk') or info.filename.split('/')[0] in keep:
+                truncated.writestr(info, archive.read(info))
+    os.replace(filename + '.tmp', filename)
+
+
+def read_metadata(filename):
+    """
+    Returns:
+        Dict with the run parameters stored in a trace file
+    """
+    with zipfile.ZipFile(filename) as archive:
+        return json.loads(archive.read(METADATA_NAME))
+
+
+def read_trace(filename, columns=None):
+    """
+    Read a trace file into a dataframe with the same columns as the csv output, the action
+    column is a categorical of the action names. The metadata is stored in the attrs of the dataframe
+
+    Args:
+        filename (string): Name of the trace file
+        columns (list<string>): Columns to read, None for all columns
+
+    Returns:
+        Dataframe with one row per step
+    """
+    columns = columns if columns is not None else [name for name, _ in COLUMNS]
+    chunks = list(read_chunks(filename, columns))
+    data = {}
+    for name, dtype in COLUMNS:
+        if name in columns:
+            data[name] = np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.array([], dtype=dtype)
+    if 'action' in data:
+        data['action'] = pd.Categorical.from_codes(data['action'], categories=ACTIONS)
+
+    frame = pd.DataFrame(data, columns=columns)
+    frame.attrs['metadata'] = read_metadata(filename)
+    return frame
+
+
+def read_results(filename):
+    """
+    Read an output file of run.py, either a trace file (.npz) or a csv file
+
+    Returns:
+        Dataframe with one row per step
+    """
+    if os.path.splitext(filename)[1] == '.npz':
+        return read_trace(filename)
+    return pd.read_csv(filename)
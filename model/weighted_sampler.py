@@ -0,0 +1,219 @@
+from math import nextafter
+
+
+class WeightedSampler:
+    """
+    Dynamic weighted sampler over a changing set of keys (e.g. method names)
+
+    The weights are stored in a Fenwick tree (binary indexed tree) over slots, so changing
+    the weight of a key, adding or removing a key and drawing a key proportional to its
+    weight all take O(log n). Slots of removed keys are reused through a free-list.
+    Next to that a plain list of the keys is kept for O(1) uniform sampling.
+
+    Weights are expected to be integers, so the running sums in the tree stay exact.
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.tree = [0] * (capacity + 1)
+        self.weights = [0] * capacity
+        self.slot_keys = [None] * capacity
+        self.slots = {}
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.total = 0
+
+        # Keys in a list (with their position) for uniform sampling
+        self.keys = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def add(self, key, weight):
+        """
+        Add a key with a weight to the sampler
+
+        Args:
+            key: The key to add
+            weight (int): Weight of the key, should be >= 0
+        """
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+        self.slots[key] = slot
+        self.slot_keys[slot] = key
+        self.positions[key] = len(self.keys)
+        self.keys.append(key)
+        self._add(slot, weight)
+
+    def remove(self, key):
+        """
+        Remove a key from the sampler and free its slot
+
+        Args:
+            key: The key to remove
+        """
+        slot = self.slots.pop(key)
+        self._add(slot, -self.weights[slot])
+        self.slot_keys[slot] = None
+        self.free_slots.append(slot)
+
+        # Swap-remove the key from the uniform list
+        position = self.positions.pop(key)
+        last = self.keys.pop()
+        if last != key:
+            self.keys[position] = last
+            self.positions[last] = position
+
+    def set_weight(self, key, weight):
+        """
+        Change the weight of a key
+
+        Args:
+            key: The key to change the weight of
+            weight (int): New weight, should be >= 0
+        """
+        slot = self.slots[key]
+        self._add(slot, weight - self.weights[slot])
+
+    def weight(self, key):
+        """
+        Returns:
+            The current weight of a key
+        """
+        return self.weights[self.slots[key]]
+
+    def sample(self, u):
+        """
+        Draw a key proportional to its weight
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+
+        Returns:
+            Sampled key
+        """
+        # Keep the target below the total weight, also when u * total rounds up
+        return self.slot_keys[self.find(min(u * self.total, nextafter(self.total, 0)))]
+
+    def sample_uniform(self, u):
+        """
+        Draw a key uniformly, ignoring the weights
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+
+        Returns:
+            Sampled key
+        """
+        return self.keys[int(u * len(self.keys))]
+
+    def sample_excluding(self, u, excluded):
+        """
+        Draw a key proportional to its weight, as if the excluded keys were not in the sampler
+
+        The weights of the excluded keys are skipped while mapping u onto the tree, so nothing
+        is copied or changed and the cost is O(k log n) for k excluded keys
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+            excluded (iterable): Keys that can not be drawn, without duplicates
+
+        Returns:
+            Sampled key or None if every key with a positive weight is excluded
+        """
+        excluded_slots = sorted(self.slots[key] for key in excluded)
+        available = self.total - sum(self.weights[slot] for slot in excluded_slots)
+        if available <= 0:
+            return None
+        target = min(u * available, nextafter(available, 0))
+
+        # Shift the target past every excluded slot that starts before it
+        shift = 0
+        for slot in excluded_slots:
+            if target + shift < self.prefix(slot):
+                break
+            shift += self.weights[slot]
+        return self.slot_keys[self.find(target + shift)]
+
+    def sample_uniform_excluding(self, u, excluded):
+        """
+        Draw a key uniformly, as if the excluded keys were not in the sampler
+
+        Args:
+            u (float): Uniform random number in [0, 1)
+            excluded (iterable): Keys that can not be drawn, without duplicates
+
+        Returns:
+            Sampled key or None if all keys are excluded
+        """
+        excluded_positions = sorted(self.positions[key] for key in excluded)
+        available = len(self.keys) - len(excluded_positions)
+        if available <= 0:
+            return None
+        position = int(u * available)
+
+        # Shift the position past every excluded position at or before it
+        for excluded_position in excluded_positions:
+            if position < excluded_position:
+                break
+            position += 1
+        return self.keys[position]
+
+    def prefix(self, slot):
+        """
+        Returns:
+            The summed weight of all slots before slot
+        """
+        total = 0
+        index = slot
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, target):
+        """
+        Find the slot in which the cumulative weight passes target
+
+        Args:
+            target (float): Number in [0, total)
+
+        Returns:
+            Index of the slot
+        """
+        position = 0
+        step = 1 << (self.capacity.bit_length() - 1)
+        while step:
+            next_position = position + step
+            if next_position <= self.capacity and self.tree[next_position] <= target:
+                position = next_position
+                target -= self.tree[next_position]
+            step >>= 1
+        return position
+
+    def _add(self, slot, delta):
+        self.weights[slot] += delta
+        self.total += delta
+        index = slot + 1
+        while index <= self.capacity:
+            self.tree[index] += delta
+            index += index & -index
+
+    def _grow(self):
+        """
+        Double the amount of slots and rebuild the tree in O(n)
+        """
+        old_capacity = self.capacity
+        self.capacity *= 2
+        self.weights += [0] * old_capacity
+        self.slot_keys += [None] * old_capacity
+        self.free_slots = list(range(self.capacity - 1, old_capacity - 1, -1)) + self.free_slots
+
+        self.tree = [0] + list(self.weights)
+        for index in range(1, self.capacity + 1):
+            parent = index + (index & -index)
+            if parent <= self.capacity:
+                self.tree[parent] += self.tree[index]